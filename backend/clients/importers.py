@@ -0,0 +1,223 @@
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from clients.models import Client
+from companies.ledger import record_debts
+from shared.cache import bump_company_version
+from debts.models import Debt, default_due_date
+
+# Колонки файла импорта: name и phone обязательны, amount и due_date — для открытия долга
+IMPORT_COLUMNS = ('name', 'phone', 'amount', 'due_date')
+# Сколько ошибок по строкам возвращаем в ответе, остальные только считаем
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_csv_rows(file):
+    """Построчно читает CSV, не загружая файл в память целиком"""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield {key.strip().lower(): value for key, value in row.items() if key}
+
+
+def iter_xlsx_rows(file):
+    """Построчно читает первый лист XLSX в режиме read_only"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValidationError("Импорт XLSX недоступен: не установлен openpyxl.")
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip().lower() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            yield {key: value for key, value in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+
+def iter_rows(uploaded_file):
+    name = uploaded_file.name.lower()
+    if name.endswith('.csv'):
+        return iter_csv_rows(uploaded_file)
+    if name.endswith('.xlsx'):
+        return iter_xlsx_rows(uploaded_file)
+    raise ValidationError("Поддерживаются только файлы .csv и .xlsx.")
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_row(row):
+    """Приводит строку файла к (name, phone, amount, due_date) или бросает ValueError"""
+    name = _text(row.get('name'))
+    phone = _text(row.get('phone'))
+    if not name:
+        raise ValueError("Не указано имя клиента.")
+    if not phone:
+        raise ValueError("Не указан телефон клиента.")
+    if len(name) > 255 or len(phone) > 20:
+        raise ValueError("Слишком длинное имя или телефон.")
+
+    amount = None
+    raw_amount = _text(row.get('amount'))
+    if raw_amount:
+        try:
+            amount = Decimal(raw_amount.replace(',', '.')).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError("Некорректная сумма долга.")
+        if amount < 0:
+            raise ValueError("Сумма долга не может быть отрицательной.")
+
+    due_date = row.get('due_date')
+    if isinstance(due_date, datetime):
+        due_date = due_date.date()
+    elif not isinstance(due_date, date):
+        raw_due_date = _text(due_date)
+        try:
+            due_date = date.fromisoformat(raw_due_date) if raw_due_date else None
+        except ValueError:
+            raise ValueError("Некорректная дата оплаты, ожидается ГГГГ-ММ-ДД.")
+    # Как в DebtSerializer: срок в прошлом не принимается
+    if due_date and due_date <= date.today():
+        raise ValueError("Срок должен быть позже сегодняшнего дня.")
+
+    return name, phone, amount, due_date
+
+
+class ClientImporter:
+    """Импорт клиентов и их стартовых долгов пачками.
+
+    Каждая пачка проверяется на ``unique_client_name_per_company`` и
+    ``unique_client_phone_per_company`` двумя запросами ``__in`` и множествами
+    внутри пачки, затем пишется ``bulk_create`` в своей транзакции. Баланс
+    клиента сразу заполняется суммой долга, ``Debt.save`` не вызывается.
+    Память зависит только от размера пачки, а не от размера файла.
+    Битая кодировка или CSV посреди файла и клиенты, созданные параллельно
+    между проверкой и записью, попадают в ошибки по строкам, а не в 500.
+    """
+
+    def __init__(self, company, chunk_size=1000):
+        self.company = company
+        self.chunk_size = chunk_size
+        self.clients_created = 0
+        self.debts_created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def run(self, rows):
+        numbered = self.read(rows)
+        while True:
+            chunk = list(islice(numbered, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.result()
+
+    def read(self, rows):
+        """Пары (номер строки, строка); битый файл останавливает чтение с ошибкой в отчёте"""
+        # Первая строка файла — заголовок, поэтому данные начинаются со второй
+        line = 2
+        rows = iter(rows)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except UnicodeDecodeError:
+                self.add_error(line, "Файл не в кодировке UTF-8: эта и следующие строки не импортированы.")
+                return
+            except csv.Error as exc:
+                self.add_error(line, f"Ошибка CSV ({exc}): эта и следующие строки не импортированы.")
+                return
+            yield line, row
+            line += 1
+
+    def import_chunk(self, chunk):
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, *parse_row(row)))
+            except ValueError as exc:
+                self.add_error(line, str(exc))
+
+        existing = Client.objects.filter(company=self.company)
+        taken_names = set(existing.filter(name__in=[item[1] for item in parsed]).values_list('name', flat=True))
+        taken_phones = set(existing.filter(phone__in=[item[2] for item in parsed]).values_list('phone', flat=True))
+
+        accepted = []
+        for item in parsed:
+            line, name, phone = item[:3]
+            if name in taken_names:
+                self.add_error(line, f"Клиент с именем «{name}» уже существует.")
+                continue
+            if phone in taken_phones:
+                self.add_error(line, f"Клиент с телефоном {phone} уже существует.")
+                continue
+            taken_names.add(name)
+            taken_phones.add(phone)
+            accepted.append(item)
+
+        try:
+            self.save(accepted)
+        except IntegrityError:
+            # Клиента с тем же именем или телефоном создали параллельно после
+            # проверки выше: пачка откатилась, пишем её строки по одной
+            for item in accepted:
+                try:
+                    self.save([item])
+                except IntegrityError:
+                    self.add_error(item[0], f"Клиент «{item[1]}» или телефон {item[2]} уже существует.")
+
+    def build(self, rows):
+        clients = []
+        debts = []
+        for line, name, phone, amount, due_date in rows:
+            client = Client(name=name, phone=phone, company=self.company, balanse=amount or 0)
+            clients.append(client)
+            if amount:
+                debts.append(Debt(
+                    client=client,
+                    company=self.company,
+                    total_amount=amount,
+                    remaining_amount=amount,
+                    due_date=due_date or default_due_date(),
+                ))
+        return clients, debts
+
+    def save(self, rows):
+        clients, debts = self.build(rows)
+        if not clients:
+            return
+        with transaction.atomic():
+            Client.objects.bulk_create(clients)
+            Debt.objects.bulk_create(debts)
+            record_debts(self.company.pk, debts)
+            bump_company_version(self.company.pk)
+
+        self.clients_created += len(clients)
+        self.debts_created += len(debts)
+
+    def result(self):
+        return {
+            "clients_created": self.clients_created,
+            "debts_created": self.debts_created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
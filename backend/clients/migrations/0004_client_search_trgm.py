@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# GIN-индексы pg_trgm для ?search= (ILIKE '%...%' и word_similarity <%).
+# Индекс по самой колонке: clients.search.ILike пишет name ILIKE, а не
+# UPPER(name) LIKE, как стандартный icontains, который индекс не обслужит.
+# Только для PostgreSQL: на других СУБД поиск работает без них.
+# CONCURRENTLY — чтобы не блокировать запись в большую таблицу клиентов.
+INDEXES = {
+    'client_name_trgm_idx': 'name',
+    'client_phone_trgm_idx': 'phone',
+}
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON clients_client USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('clients', '0003_client_company_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from shared.cache import bump_company_version
 from shared.models import BaseModel
 
 
@@ -15,6 +16,15 @@ class Client(BaseModel):
         blank=True
     )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_company_version(self.company_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_company_version(self.company_id)
+        return result
+
     def __str__(self):
         return self.name
     
@@ -28,4 +38,7 @@ class Client(BaseModel):
                 fields=['company', 'phone'],
                 name='unique_client_phone_per_company'
             )
+        ]
+        indexes = [
+            models.Index(fields=['company', 'created_at', 'id'], name='client_company_created_idx'),
         ]
\ No newline at end of file
@@ -0,0 +1,70 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Lookup, Q, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+
+class ILike(Lookup):
+    """``колонка ILIKE шаблон`` без обёрток над колонкой.
+
+    Стандартный ``icontains`` на PostgreSQL — ``UPPER(name) LIKE UPPER(...)``,
+    его GIN-индекс pg_trgm по ``name`` обслужить не может.
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", [*lhs_params, *rhs_params]
+
+
+def search_clients(queryset, query, limit):
+    """Поиск клиентов по началу/части имени и телефона, с ранжированием.
+
+    На PostgreSQL используются ``name ILIKE '%...%'`` и нечёткое совпадение
+    ``<%`` (word_similarity) — оба по GIN-индексам pg_trgm (см. миграцию
+    0004_client_search_trgm). На других СУБД — переносимый вариант без
+    нечёткого поиска: вхождение подстроки, префикс выше.
+    """
+    digits = re.sub(r'\D', '', query)
+    postgresql = connection.vendor == 'postgresql'
+
+    if postgresql:
+        matches = Q(ILike(F('name'), f"%{connection.ops.prep_for_like_query(query)}%"))
+    else:
+        matches = Q(name__icontains=query)
+    if len(digits) >= 3:
+        matches |= Q(phone__contains=digits)
+
+    prefix = Case(
+        When(name__istartswith=query, then=Value(1.0)),
+        When(phone__startswith=digits or query, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+    if postgresql:
+        if len(query) >= 3:
+            matches |= Q(name__trigram_word_similar=query)
+        rank = prefix + TrigramWordSimilarity(query, 'name')
+    else:
+        rank = prefix
+
+    return queryset.filter(matches).annotate(rank=rank).order_by('-rank', 'name', 'id')[:limit]
+
+
+class ClientSearchFilter(BaseFilterBackend):
+    """``?search=`` — ранжированный поиск, не больше CLIENT_SEARCH_LIMIT строк"""
+    search_param = 'search'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return search_clients(queryset, query[:100], settings.CLIENT_SEARCH_LIMIT)
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from clients.models import Client
 from rest_framework.exceptions import ValidationError
 from debts.models import Debt
+from shared.compact import CompactRows
 
 
 class ClientSerializer(serializers.ModelSerializer):
@@ -14,11 +15,10 @@ class ClientSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
 
-        if not user.company:
+        if not user.company_id:
             raise ValidationError("У пользователя нет связанной компании.")
-        
-        company = user.company
-        validated_data['company'] = company
+
+        validated_data['company_id'] = user.company_id
         return super().create(validated_data)
 
 
@@ -29,8 +29,7 @@ class DebtSerializer(serializers.ModelSerializer):
     class Meta:
         model = Debt
         fields = '__all__'
-        read_only_fields = ('is_paid', 'remaining_amount')
-        depth = 1
+        read_only_fields = ('is_paid', 'remaining_amount', 'company', 'overdue_at')
     
     def validate(self, attrs):
         """Проверка на отрицательные значения"""
@@ -38,3 +37,6 @@ class DebtSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Сумма долга не может быть отрицательной.")
         return attrs
 
+
+# ?view=compact: только колонки, которые показывает список клиентов
+CLIENT_COMPACT = CompactRows(Client, ('id', 'name', 'phone', 'balanse'))
@@ -1,3 +1,308 @@
-from django.test import TestCase
+import csv
+import tempfile
+import unittest
+import uuid
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clients.importers import ClientImporter
+from clients.models import Client
+from clients.search import search_clients
+from companies.models import Company
+from debts.models import Debt
+from payments.models import Payment
+from users.models import User
+
+
+class ClientListDebtsQueryCountTest(TestCase):
+    """Количество запросов не зависит от числа долгов клиента"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        self.client_obj = Client.objects.create(name="Али", phone="998901112233", company=company)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_query_count_is_constant(self):
+        for _ in range(25):
+            Debt.objects.create(client=self.client_obj, total_amount=Decimal("100.00"))
+
+        url = reverse("client-debts", kwargs={"id": self.client_obj.id})
+        # ETag, клиент, долги
+        with self.assertNumQueries(3):
+            response = self.api.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["debts"]), 25)
+
+
+class ClientImportTest(TestCase):
+    """Импорт CSV создаёт клиентов и долги пачками и сообщает об ошибках по строкам"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_import_csv(self):
+        content = (
+            "name,phone,amount,due_date\n"
+            "Вали,998900000001,150.50,2030-01-01\n"
+            "Али,998900000002,10,\n"
+            "Гани,998900000001,,\n"
+            "Сора,998900000003,,\n"
+            ",998900000004,5,\n"
+        )
+        upload = SimpleUploadedFile("clients.csv", content.encode("utf-8"), content_type="text/csv")
+
+        response = self.api.post(reverse("client-import"), {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["clients_created"], 2)
+        self.assertEqual(response.data["debts_created"], 1)
+        self.assertEqual([error["line"] for error in response.data["errors"]], [6, 3, 4])
+        vali = Client.objects.get(company=self.company, name="Вали")
+        self.assertEqual(vali.balanse, Decimal("150.50"))
+        self.assertEqual(vali.debts.get().remaining_amount, Decimal("150.50"))
+
+    def post(self, content, name="clients.csv"):
+        upload = SimpleUploadedFile(name, content, content_type="text/csv")
+        return self.api.post(reverse("client-import"), {"file": upload}, format="multipart")
+
+    def test_past_due_date_is_rejected(self):
+        response = self.post((
+            "name,phone,amount,due_date\n"
+            "Вали,998900000001,10,2020-01-01\n"
+            f"Сора,998900000003,10,{date.today().isoformat()}\n"
+        ).encode("utf-8"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["line"] for error in response.data["errors"]], [2, 3])
+        self.assertFalse(Debt.objects.exists())
+
+    def test_broken_encoding_midway(self):
+        # Первые строки декодируются раньше, чем TextIOWrapper дойдёт до cp1251
+        rows = "".join(f"Клиент {index},99890{index:07d},,\n" for index in range(400))
+        response = self.post(("name,phone,amount,due_date\n" + rows).encode("utf-8") + "Вали,998911111111,,\n".encode("cp1251"))
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(response.data["clients_created"], 0)
+        self.assertLess(response.data["clients_created"], 400)
+        error = response.data["errors"][-1]
+        self.assertIn("UTF-8", error["error"])
+        self.assertEqual(error["line"], response.data["clients_created"] + 2)
+
+        response = self.post("name,phone\nВали,998911111111\n".encode("cp1251"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"][0]["line"], 2)
+
+    def test_broken_csv_midway(self):
+        response = self.post((
+            "name,phone\n"
+            "Вали,998900000001\n"
+            f"{'x' * (csv.field_size_limit() + 1)},998900000002\n"
+            "Сора,998900000003\n"
+        ).encode("utf-8"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["clients_created"], 1)
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+        self.assertIn("CSV", response.data["errors"][0]["error"])
+
+    def test_concurrent_insert(self):
+        build = ClientImporter.build
+
+        def build_after_concurrent_insert(importer, rows):
+            # Другой запрос создаёт «Сору» между проверкой пачки и записью
+            Client.objects.get_or_create(name="Сора", phone="998900000099", company=self.company)
+            return build(importer, rows)
+
+        content = "name,phone,amount\nВали,998900000001,10\nСора,998900000003,20\n".encode("utf-8")
+        with mock.patch.object(ClientImporter, "build", autospec=True, side_effect=build_after_concurrent_insert):
+            response = self.post(content)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["clients_created"], 1)
+        self.assertEqual(response.data["debts_created"], 1)
+        self.assertEqual([error["line"] for error in response.data["errors"]], [3])
+        self.assertFalse(Debt.objects.filter(client__name="Сора").exists())
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+
+@override_settings(API_RESPONSE_CACHE_TIMEOUT=300)
+class ClientListCacheTest(TestCase):
+    """Списки отдаются из кэша и сбрасываются при записи долга, платежа или клиента"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        self.client_obj = Client.objects.create(name="Али", phone="998901112233", company=company)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def check_cache(self):
+        clients_url = reverse("client-list")
+        debts_url = reverse("client-debts", kwargs={"id": self.client_obj.id})
+        self.api.get(clients_url)
+        self.api.get(debts_url)
+        with self.assertNumQueries(0):
+            self.api.get(clients_url)
+            self.api.get(debts_url)
+
+        debt = Debt.objects.create(client=self.client_obj, total_amount=Decimal("100.00"))
+        self.assertEqual(self.api.get(clients_url).data[0]["balanse"], "100.00")
+        self.assertEqual(len(self.api.get(debts_url).data["debts"]), 1)
+
+        Payment.objects.create(debt=debt, amount=Decimal("40.00"), user=self.user)
+        self.assertEqual(self.api.get(clients_url).data[0]["balanse"], "60.00")
+        self.assertEqual(self.api.get(debts_url).data["debts"][0]["remaining_amount"], "60.00")
+
+        Client.objects.create(name="Вали", phone="998900000001", company=self.user.company)
+        self.assertEqual(len(self.api.get(clients_url).data), 2)
+
+        # Другие параметры запроса — другой ключ (ETag и страница)
+        with self.assertNumQueries(2):
+            self.api.get(clients_url, {"page_size": 1})
+
+    def test_local_memory_cache(self):
+        self.check_cache()
+
+    def test_file_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}
+            with override_settings(CACHES={"default": backend}):
+                self.check_cache()
+
+
+class ConditionalGetTest(TestCase):
+    """ETag из max(updated_at)/count: 304 без сериализации, новый тег после записи"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        self.client_obj = Client.objects.create(name="Али", phone="998901112233", company=company)
+        self.debt = Debt.objects.create(client=self.client_obj, total_amount=Decimal("100.00"))
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_not_modified(self):
+        urls = [
+            reverse("client-list"),
+            reverse("client-debts", kwargs={"id": self.client_obj.id}),
+            reverse("debt-list-create"),
+            reverse("debt-detail", kwargs={"pk": self.debt.pk}),
+            reverse("debt-payments", kwargs={"id": self.debt.id}),
+            reverse("payment-list"),
+        ]
+        etags = {}
+        for url in urls:
+            etags[url] = self.api.get(url)["ETag"]
+            with self.assertNumQueries(1):
+                response = self.api.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304, url)
+            self.assertFalse(response.content)
+
+        Payment.objects.create(debt=self.debt, amount=Decimal("40.00"), user=self.user)
+        for url in urls:
+            response = self.api.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response["ETag"], etags[url])
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=300)
+    def test_cached_list_answers_without_queries(self):
+        url = reverse("debt-list-create")
+        etag = self.api.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class ClientSearchTest(TestCase):
+    """?search= ищет по имени и телефону, префиксные совпадения выше, выдача ограничена"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        for name, phone in (("Vali Alisher", "998907776655"), ("Alisher", "998901112233"), ("Bobur", "998901234567")):
+            Client.objects.create(name=name, phone=phone, company=company)
+        other = Company.objects.create(name="Другой магазин")
+        Client.objects.create(name="Alisher", phone="998909999999", company=other)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        response = self.api.get(reverse("client-list"), {"search": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [client["name"] for client in response.data]
+
+    def test_ranked_by_prefix(self):
+        self.assertEqual(self.search("alish"), ["Alisher", "Vali Alisher"])
+        self.assertEqual(self.search("+998 90 123"), ["Bobur"])
+        self.assertEqual(self.search("zzz"), [])
+
+    @override_settings(CLIENT_SEARCH_LIMIT=1)
+    def test_limit_ignores_pagination(self):
+        self.assertEqual(self.search("ali", page_size=10), ["Alisher"])
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "pg_trgm есть только в PostgreSQL")
+    def test_fuzzy_match(self):
+        self.assertIn("Alisher", self.search("Alishr"))
+
+    def test_like_wildcards_are_literal(self):
+        self.assertEqual(self.search("%"), [])
+        self.assertEqual(self.search("A_i"), [])
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "pg_trgm есть только в PostgreSQL")
+    def test_substring_match_uses_bare_column(self):
+        # Индекс gin (name gin_trgm_ops) обслуживает только ILIKE по самой колонке
+        queryset = search_clients(Client.objects.filter(company=self.user.company), "lish", 10)
+        self.assertIn('"clients_client"."name" ILIKE', str(queryset.query))
+        self.assertEqual([client.name for client in queryset], ["Alisher", "Vali Alisher"])
+
+
+class AsyncClientViewTest(TestCase):
+    """Async-эндпоинты клиентов отдают то же, что синхронные, включая поиск и ошибки доступа"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        self.client_obj = Client.objects.create(name="Alisher", phone="998901112233", company=company)
+        Client.objects.create(name="Bobur", phone="998901234567", company=company)
+        Debt.objects.create(client=self.client_obj, total_amount=Decimal("100.00"))
+        other = Company.objects.create(name="Другой магазин")
+        self.foreign = Client.objects.create(name="Alisher", phone="998909999999", company=other)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_list_matches_sync(self):
+        for params in ({}, {"view": "compact"}, {"search": "alish"}):
+            response = self.api.get(reverse("client-list-async"), params)
+            self.assertEqual(response.status_code, 200, params)
+            self.assertEqual(response.json(), self.api.get(reverse("client-list"), params).json(), params)
+        self.assertEqual([client["name"] for client in response.json()], ["Alisher"])
+
+    def test_debts_match_sync(self):
+        kwargs = {"id": self.client_obj.id}
+        for params in ({}, {"view": "compact"}):
+            response = self.api.get(reverse("client-debts-async", kwargs=kwargs), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), self.api.get(reverse("client-debts", kwargs=kwargs), params).json())
+        url = reverse("client-debts-async", kwargs=kwargs)
+        self.assertEqual(self.api.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_foreign_and_missing_client(self):
+        for client_id, status_code in ((self.foreign.id, 403), (uuid.uuid4(), 404)):
+            response = self.api.get(reverse("client-debts-async", kwargs={"id": client_id}))
+            self.assertEqual(response.status_code, status_code)
+            self.assertEqual(self.api.get(reverse("client-debts", kwargs={"id": client_id})).status_code, status_code)
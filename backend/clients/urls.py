@@ -1,7 +1,15 @@
 from django.urls import path
-from clients.views import ClientListCreateView,ClientListDebtsView
+from clients.views import (
+    ClientListCreateView, ClientListDebtsView, ClientImportView, ClientExportView,
+    AsyncClientListView, AsyncClientDebtsView,
+)
 
 urlpatterns = [
     path('', ClientListCreateView.as_view(), name='client-list'),
-    path('<uuid:id>/debts/', ClientListDebtsView.as_view(), name='client-debts')
+    path('import/', ClientImportView.as_view(), name='client-import'),
+    path('export/', ClientExportView.as_view(), name='client-export'),
+    path('<uuid:id>/debts/', ClientListDebtsView.as_view(), name='client-debts'),
+    # Async-варианты для ASGI (только чтение)
+    path('async/', AsyncClientListView.as_view(), name='client-list-async'),
+    path('<uuid:id>/debts/async/', AsyncClientDebtsView.as_view(), name='client-debts-async'),
 ]
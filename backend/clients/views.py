@@ -1,42 +1,180 @@
-from rest_framework import generics, permissions
+from django.conf import settings
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from clients.importers import ClientImporter, iter_rows
 from clients.models import Client
-from clients.serializers import ClientSerializer, DebtSerializer
+from clients.search import ClientSearchFilter, search_clients
+from clients.serializers import CLIENT_COMPACT, ClientSerializer, DebtSerializer
+from debts.models import Debt
+from debts.serializers import DEBT_COMPACT
+from shared.asyncviews import AsyncReadView, render_json
+from shared.compact import CompactListMixin
+from django.db.models import Count, Max
+from shared.cache import cache_company_etag, cache_company_response
+from shared.conditional import ConditionalGetMixin, conditional_get, etag_matches, make_etag
+from shared.exports import ExportView
+from django.http import HttpResponseNotModified
 from django.shortcuts import get_object_or_404
 
 
 
-class ClientListCreateView(generics.ListCreateAPIView):
+class ClientListCreateView(CompactListMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """Просмотр списка клиентов и добавление нового"""
     serializer_class = ClientSerializer
+    compact_rows = CLIENT_COMPACT
+    filter_backends = [ClientSearchFilter]
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    @cache_company_etag
+    def get_etag(self, request):
+        return super().get_etag(request)
+
+    @conditional_get
+    @cache_company_response
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
-        if user.company:
-            return Client.objects.filter(company=user.company)
+        if user.company_id:
+            return Client.objects.filter(company_id=user.company_id)
         else:
             raise ValueError("У пользователя нет связанной компании.")
 
+    def paginate_queryset(self, queryset):
+        # Результаты поиска уже отсортированы по релевантности и ограничены
+        if ClientSearchFilter().get_search_query(self.request):
+            return None
+        return super().paginate_queryset(queryset)
+
 
 
 class ClientListDebtsView(APIView):
     """Просмотр задолженности конкретного клиента + сам клиент один раз"""
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
 
+    @cache_company_etag
+    def get_etag(self, request):
+        """Клиент и его долги одним агрегатом: updated_at клиента, max/count долгов"""
+        company_id = getattr(request.user, 'company_id', None)
+        if company_id is None:
+            return None
+        stats = Client.objects.filter(id=self.kwargs['id'], company_id=company_id).aggregate(
+            client_modified=Max('updated_at'),
+            debts_modified=Max('debts__updated_at'),
+            debt_count=Count('debts'),
+        )
+        if stats['client_modified'] is None:
+            return None
+        return make_etag(type(self).__name__, *stats.values())
+
+    @conditional_get
+    @cache_company_response
     def get(self, request, id):
         client = get_object_or_404(Client, id=id)
 
-        if client.company != request.user.company:
+        # Сравниваем по company_id, чтобы не подгружать компании отдельными запросами
+        if client.company_id != request.user.company_id:
             raise PermissionDenied("У вас нет доступа к задолженности этого клиента.")
 
-        debts = client.debts.all()
+        if request.query_params.get('view') == 'compact':
+            # Клиент уже отдан отдельно, у долгов — только его id
+            return Response({
+                "client": CLIENT_COMPACT.from_instance(client),
+                "debts": DEBT_COMPACT.rows(DEBT_COMPACT.values(Debt.objects.filter(client_id=client.id))),
+            })
+
+        # Вложенный ClientSerializer у каждого долга берёт уже загруженного клиента
+        debts = client.debts.select_related('client')
         client_data = ClientSerializer(client).data
         debts_data = DebtSerializer(debts, many=True).data
 
         return Response({
             "client": client_data,
             "debts": debts_data
-        })
\ No newline at end of file
+        })
+
+
+class ClientImportView(APIView):
+    """Импорт клиентов и их долгов из CSV/XLSX (колонки name, phone, amount, due_date)"""
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        company = request.user.company
+        if company is None:
+            raise PermissionDenied("У пользователя нет связанной компании.")
+
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({"detail": "Файл не передан (поле file)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = ClientImporter(company, chunk_size=settings.CLIENT_IMPORT_CHUNK_SIZE)
+        result = importer.run(iter_rows(uploaded_file))
+        return Response(result, status=status.HTTP_201_CREATED if result["clients_created"] else status.HTTP_400_BAD_REQUEST)
+
+
+
+class ClientExportView(ExportView):
+    """Выгрузка клиентов компании в CSV/NDJSON"""
+    model = Client
+    columns = (
+        ("id", "id"),
+        ("name", "name"),
+        ("phone", "phone"),
+        ("balanse", "balanse"),
+        ("created_at", "created_at"),
+    )
+    filename = "clients"
+
+
+class AsyncClientListView(AsyncReadView):
+    """Async-вариант списка клиентов для ASGI (только чтение, ?search= поддерживается)"""
+    serializer_class = ClientSerializer
+    compact_rows = CLIENT_COMPACT
+
+    def get_queryset(self):
+        queryset = Client.objects.filter(company_id=self.request.user.company_id)
+        query = self.request.GET.get('search', '').strip()
+        if query:
+            return search_clients(queryset, query[:100], settings.CLIENT_SEARCH_LIMIT)
+        return queryset
+
+
+class AsyncClientDebtsView(AsyncReadView):
+    """Async-вариант ClientListDebtsView"""
+
+    async def get(self, request, id):
+        client = await Client.objects.filter(id=id).afirst()
+        if client is None:
+            return render_json({"detail": "No Client matches the given query."}, status.HTTP_404_NOT_FOUND)
+        if client.company_id != request.user.company_id:
+            return render_json(
+                {"detail": "У вас нет доступа к задолженности этого клиента."}, status.HTTP_403_FORBIDDEN
+            )
+
+        debts = Debt.objects.filter(client_id=client.id)
+        stats = await debts.order_by().aaggregate(debts_modified=Max('updated_at'), debt_count=Count('pk'))
+        etag = make_etag(type(self).__name__, client.updated_at, *stats.values(), sorted(request.GET.lists()))
+        if etag_matches(etag, request):
+            response = HttpResponseNotModified()
+        elif self.is_compact():
+            response = render_json({
+                "client": CLIENT_COMPACT.from_instance(client),
+                "debts": [DEBT_COMPACT.row(row) async for row in DEBT_COMPACT.values(debts)],
+            })
+        else:
+            debt_objects = [debt async for debt in debts]
+            for debt in debt_objects:
+                debt.client = client
+            response = render_json({
+                "client": ClientSerializer(client).data,
+                "debts": DebtSerializer(debt_objects, many=True).data,
+            })
+        response['ETag'] = etag
+        return response
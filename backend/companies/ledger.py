@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from companies.models import CompanyLedger, CompanyLedgerDay
+
+# Поля дневного среза, которые копятся приращениями
+DAY_FIELDS = ('new_debt_count', 'new_debt_amount', 'collected', 'payment_count', 'due_amount', 'due_count')
+
+
+def _bump(model, lookup, deltas):
+    """Прибавляет deltas к строке lookup, создавая её при первом обращении"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Строку только что создала параллельная транзакция
+        model.objects.filter(**lookup).update(**updates)
+
+
+def _apply(company_id, totals, days):
+    _bump(CompanyLedger, {'company_id': company_id}, totals)
+    for day, deltas in sorted(days.items()):
+        _bump(CompanyLedgerDay, {'company_id': company_id, 'day': day}, deltas)
+
+
+def record_debts(company_id, debts):
+    """Учитывает новые долги: ``debts`` — объекты Debt с заполненным created_at"""
+    if company_id is None:
+        return
+    totals = defaultdict(int)
+    days = defaultdict(lambda: defaultdict(int))
+    for debt in debts:
+        totals['outstanding'] += debt.total_amount
+        totals['debt_count'] += 1
+        created = days[timezone.localdate(debt.created_at)]
+        created['new_debt_count'] += 1
+        created['new_debt_amount'] += debt.total_amount
+        if not debt.is_paid:
+            due = days[debt.due_date]
+            due['due_amount'] += debt.total_amount
+            due['due_count'] += 1
+    _apply(company_id, totals, days)
+
+
+def record_payments(company_id, payments):
+    """Учитывает проведённые платежи.
+
+    Вызывается после того, как остатки долгов уже уменьшены: по ``is_paid``
+    долга видно, закрыл ли платёж его срок оплаты.
+    """
+    if company_id is None:
+        return
+    today = timezone.localdate()
+    totals = defaultdict(int)
+    days = defaultdict(lambda: defaultdict(int))
+    closed = set()
+    for payment in payments:
+        debt = payment.debt
+        totals['outstanding'] -= payment.amount
+        totals['collected'] += payment.amount
+        totals['payment_count'] += 1
+        paid = days[today]
+        paid['collected'] += payment.amount
+        paid['payment_count'] += 1
+        due = days[debt.due_date]
+        due['due_amount'] -= payment.amount
+        if debt.is_paid and debt.pk not in closed:
+            closed.add(debt.pk)
+            due['due_count'] -= 1
+    _apply(company_id, totals, days)
+
+
+def record_due_date_change(company_id, debt, old_due_date):
+    """Переносит остаток неоплаченного долга на новый срок оплаты"""
+    if company_id is None or debt.is_paid or debt.due_date == old_due_date:
+        return
+    amount = debt.remaining_amount
+    _apply(company_id, {}, {
+        old_due_date: {'due_amount': -amount, 'due_count': -1},
+        debt.due_date: {'due_amount': amount, 'due_count': 1},
+    })
+
+
+def record_payment_change(company_id, debt, amount, day, count, was_paid):
+    """Учитывает изменение проведённого платежа.
+
+    ``amount`` списано с долга (отрицательное — возвращено при удалении или
+    уменьшении платежа), ``count`` — изменение числа платежей, ``day`` — день
+    платежа, ``debt`` — состояние долга уже после изменения.
+    """
+    if company_id is None:
+        return
+    days = defaultdict(lambda: defaultdict(int))
+    days[day]['collected'] += amount
+    days[day]['payment_count'] += count
+    due = days[debt.due_date]
+    due['due_amount'] -= amount
+    if debt.is_paid != was_paid:
+        due['due_count'] += -1 if debt.is_paid else 1
+    _apply(company_id, {'outstanding': -amount, 'collected': amount, 'payment_count': count}, days)
+
+
+def record_debt_total_change(company_id, debt, delta, old_due_date, was_paid):
+    """Учитывает изменение суммы долга на ``delta`` — по старому сроку оплаты,
+    перенос срока затем учитывает ``record_due_date_change``"""
+    if company_id is None or not delta:
+        return
+    days = defaultdict(lambda: defaultdict(int))
+    days[timezone.localdate(debt.created_at)]['new_debt_amount'] += delta
+    due = days[old_due_date]
+    due['due_amount'] += delta
+    if debt.is_paid != was_paid:
+        due['due_count'] += -1 if debt.is_paid else 1
+    _apply(company_id, {'outstanding': delta}, days)
+
+
+def record_debt_removal(company_id, debt, payments):
+    """Убирает из сводки удалённый долг и его платежи.
+
+    ``payments`` — тройки ``(день, сумма, число)`` платежей долга по дням.
+    """
+    if company_id is None:
+        return
+    totals = defaultdict(int, {'outstanding': -debt.remaining_amount, 'debt_count': -1})
+    days = defaultdict(lambda: defaultdict(int))
+    created = days[timezone.localdate(debt.created_at)]
+    created['new_debt_count'] -= 1
+    created['new_debt_amount'] -= debt.total_amount
+    if not debt.is_paid:
+        due = days[debt.due_date]
+        due['due_amount'] -= debt.remaining_amount
+        due['due_count'] -= 1
+    for day, amount, count in payments:
+        totals['collected'] -= amount
+        totals['payment_count'] -= count
+        days[day]['collected'] -= amount
+        days[day]['payment_count'] -= count
+    _apply(company_id, totals, days)
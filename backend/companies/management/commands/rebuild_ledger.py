@@ -0,0 +1,123 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+from companies.ledger import DAY_FIELDS
+from companies.models import Company, CompanyLedger, CompanyLedgerDay
+from debts.models import Debt
+from payments.models import Payment
+from shared.cache import bump_company_version
+
+TOTAL_FIELDS = ('outstanding', 'collected', 'debt_count', 'payment_count')
+# Сколько расхождений по одной компании печатать подробно
+MAX_REPORTED = 10
+
+
+def compute_ledger(company_id):
+    """Считает итоги и дневные срезы компании заново по сырым таблицам"""
+    debts = Debt.objects.filter(company_id=company_id)
+    payments = Payment.objects.filter(company_id=company_id)
+
+    debt_totals = debts.aggregate(outstanding=Sum('remaining_amount'), debt_count=Count('id'))
+    payment_totals = payments.aggregate(collected=Sum('amount'), payment_count=Count('id'))
+    totals = {field: value or 0 for field, value in {**debt_totals, **payment_totals}.items()}
+
+    days = defaultdict(lambda: dict.fromkeys(DAY_FIELDS, 0))
+    rows = [
+        debts.annotate(day=TruncDate('created_at')).values('day')
+        .annotate(new_debt_count=Count('id'), new_debt_amount=Sum('total_amount')),
+        debts.filter(is_paid=False).values(day=F('due_date'))
+        .annotate(due_amount=Sum('remaining_amount'), due_count=Count('id')),
+        payments.annotate(day=TruncDate('created_at')).values('day')
+        .annotate(collected=Sum('amount'), payment_count=Count('id')),
+    ]
+    for queryset in rows:
+        for row in queryset.order_by():
+            day = row.pop('day')
+            days[day].update({field: value or 0 for field, value in row.items()})
+    return totals, days
+
+
+def stored_ledger(company_id):
+    ledger = CompanyLedger.objects.filter(company_id=company_id).values(*TOTAL_FIELDS).first()
+    totals = ledger or dict.fromkeys(TOTAL_FIELDS, 0)
+    days = {
+        row.pop('day'): row
+        for row in CompanyLedgerDay.objects.filter(company_id=company_id).values('day', *DAY_FIELDS)
+    }
+    return totals, days
+
+
+def diff_ledger(expected, stored):
+    """Список расхождений (где, поле, ожидалось, хранится)"""
+    expected_totals, expected_days = expected
+    stored_totals, stored_days = stored
+    mismatches = [
+        ('total', field, expected_totals[field], stored_totals[field])
+        for field in TOTAL_FIELDS
+        if Decimal(expected_totals[field]) != Decimal(stored_totals[field])
+    ]
+    empty = dict.fromkeys(DAY_FIELDS, 0)
+    for day in sorted(set(expected_days) | set(stored_days)):
+        want = expected_days.get(day, empty)
+        have = stored_days.get(day, empty)
+        mismatches += [
+            (day, field, want[field], have[field])
+            for field in DAY_FIELDS
+            if Decimal(want[field]) != Decimal(have[field])
+        ]
+    return mismatches
+
+
+class Command(BaseCommand):
+    help = "Пересобирает сводки CompanyLedger/CompanyLedgerDay по долгам и платежам или сверяет их (--check)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Только сверить сводку с сырыми таблицами")
+        parser.add_argument('--company', help="ID компании (по умолчанию — все)")
+
+    def handle(self, *args, check=False, company=None, **options):
+        companies = Company.objects.order_by('pk')
+        if company:
+            companies = companies.filter(pk=company)
+
+        total_mismatches = 0
+        for company_id in companies.values_list('pk', flat=True).iterator():
+            if check:
+                mismatches = diff_ledger(compute_ledger(company_id), stored_ledger(company_id))
+                total_mismatches += len(mismatches)
+                for where, field, expected, stored in mismatches[:MAX_REPORTED]:
+                    self.stdout.write(f"{company_id} {where} {field}: ожидалось {expected}, в сводке {stored}")
+            else:
+                self.rebuild(company_id)
+
+        if not check:
+            self.stdout.write(self.style.SUCCESS("Сводки пересобраны."))
+        elif total_mismatches:
+            raise CommandError(f"Найдено расхождений: {total_mismatches}")
+        else:
+            self.stdout.write(self.style.SUCCESS("Сводки совпадают с данными."))
+
+    @transaction.atomic
+    def rebuild(self, company_id):
+        # Блокируем итоговую строку: параллельные платежи дождутся конца
+        # пересборки и применят свои приращения уже к новым значениям
+        CompanyLedger.objects.get_or_create(company_id=company_id)
+        ledger = CompanyLedger.objects.select_for_update().get(company_id=company_id)
+
+        totals, days = compute_ledger(company_id)
+        for field, value in totals.items():
+            setattr(ledger, field, value)
+        ledger.save()
+
+        CompanyLedgerDay.objects.filter(company_id=company_id).delete()
+        CompanyLedgerDay.objects.bulk_create(
+            CompanyLedgerDay(company_id=company_id, day=day, **values)
+            for day, values in days.items()
+        )
+        # Сводку читают с реплик: после коммита компания читает с основной базы
+        bump_company_version(company_id)
@@ -8,3 +8,40 @@ class Company(BaseModel):
 
     def __str__(self):
         return self.name
+
+
+class CompanyLedger(models.Model):
+    """Итоги компании, обновляемые вместе с долгами и платежами"""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='ledger')
+    outstanding = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debt_count = models.IntegerField(default=0)
+    payment_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.company_id}: {self.outstanding}"
+
+
+class CompanyLedgerDay(models.Model):
+    """Дневной срез по компании.
+
+    ``new_*`` и ``collected``/``payment_count`` относятся к долгам и платежам,
+    созданным в этот день; ``due_amount``/``due_count`` — к неоплаченным
+    долгам со сроком оплаты в этот день (по ним считается просрочка).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='ledger_days')
+    day = models.DateField()
+    new_debt_count = models.IntegerField(default=0)
+    new_debt_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+    due_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    due_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'day'], name='unique_ledger_day_per_company'),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} {self.day}"
@@ -1,3 +1,146 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from companies.models import Company, CompanyLedger, CompanyLedgerDay
+from debts.models import Debt
+from payments.models import Payment
+from payments.services import post_payments_bulk
+from users.models import User
+
+
+class CompanyLedgerTest(TestCase):
+    """Сводка, обновляемая при записи, совпадает с пересчётом по сырым таблицам"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        self.debts = [Debt.objects.create(client=client, total_amount=Decimal("100.00")) for _ in range(3)]
+
+    def test_incremental_ledger_matches_rebuild(self):
+        Payment.objects.create(debt=self.debts[0], amount=Decimal("100.00"), user=self.user)
+        post_payments_bulk([(self.debts[1].id, Decimal("40.00")), (self.debts[1].id, Decimal("10.00"))], self.user)
+
+        ledger = CompanyLedger.objects.get(company=self.company)
+        self.assertEqual(ledger.outstanding, Decimal("150.00"))
+        self.assertEqual(ledger.collected, Decimal("150.00"))
+        self.assertEqual(ledger.payment_count, 3)
+
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+    def test_edits_and_deletes_keep_ledger(self):
+        overdue = Debt.objects.create(client=self.debts[0].client, total_amount=Decimal("80.00"), due_date=date(2020, 1, 1))
+        payment = Payment.objects.create(debt=self.debts[0], amount=Decimal("60.00"), user=self.user)
+        Payment.objects.create(debt=overdue, amount=Decimal("20.00"), user=self.user)
+
+        self.debts[1].total_amount = Decimal("150.00")
+        self.debts[1].save()
+        overdue.total_amount = Decimal("50.00")
+        overdue.save()
+        payment.amount = Decimal("25.00")
+        payment.save()
+        self.debts[2].delete()
+
+        ledger = CompanyLedger.objects.get(company=self.company)
+        self.assertEqual(ledger.outstanding, Decimal("255.00"))
+        self.assertEqual(ledger.collected, Decimal("45.00"))
+        self.assertEqual((ledger.debt_count, ledger.payment_count), (3, 2))
+        overdue_day = CompanyLedgerDay.objects.get(company=self.company, day=date(2020, 1, 1))
+        self.assertEqual((overdue_day.due_amount, overdue_day.due_count), (Decimal("30.00"), 1))
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+        payment.delete()
+        overdue.delete()
+        ledger.refresh_from_db()
+        self.assertEqual(ledger.outstanding, Decimal("250.00"))
+        self.assertEqual(ledger.collected, Decimal("0.00"))
+        self.assertEqual((ledger.debt_count, ledger.payment_count), (2, 0))
+        overdue_day.refresh_from_db()
+        self.assertEqual((overdue_day.due_amount, overdue_day.due_count), (Decimal("0.00"), 0))
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+    def test_due_date_patch_moves_due_amount(self):
+        debt = self.debts[0]
+        Payment.objects.create(debt=debt, amount=Decimal("30.00"), user=self.user)
+        old_day = debt.due_date
+        api = APIClient()
+        api.force_authenticate(self.user)
+
+        response = api.patch(reverse("debt-detail", kwargs={"pk": debt.pk}), {"due_date": "2030-01-01"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        days = CompanyLedgerDay.objects.filter(company=self.company)
+        old = days.get(day=old_day)
+        self.assertEqual((old.due_amount, old.due_count), (Decimal("200.00"), 2))
+        new = days.get(day=date(2030, 1, 1))
+        self.assertEqual((new.due_amount, new.due_count), (Decimal("70.00"), 1))
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+
+class CompanySummaryViewTest(TestCase):
+    """Показатели сводки по данным своей компании и проверка периода"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        self.ali = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        self.vali = Client.objects.create(name="Вали", phone="998904445566", company=self.company)
+        overdue = Debt.objects.create(client=self.ali, total_amount=Decimal("100.00"), due_date=date(2020, 1, 1))
+        Debt.objects.create(client=self.ali, total_amount=Decimal("200.00"))
+        Debt.objects.create(client=self.vali, total_amount=Decimal("50.00"))
+        Payment.objects.create(debt=overdue, amount=Decimal("30.00"), user=self.user)
+
+        other = Company.objects.create(name="Чужой")
+        stranger = Client.objects.create(name="Чужой клиент", phone="998907778899", company=other)
+        Debt.objects.create(client=stranger, total_amount=Decimal("999.00"), due_date=date(2020, 1, 1))
+
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_summary(self):
+        response = self.api.get(reverse("company-summary"))
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        today = timezone.now().date()
+        self.assertEqual(data["period"], {"date_from": today.replace(day=1), "date_to": today})
+        self.assertEqual(data["clients"], {
+            "total": 2, "active": 2,
+            "total_balance": Decimal("320.00"), "average_balance": Decimal("160.00"),
+        })
+        self.assertEqual(data["debts"], {
+            "outstanding": Decimal("320.00"),
+            "overdue_amount": Decimal("70.00"),
+            "overdue_count": 1,
+            "new_count": 3,
+            "new_amount": Decimal("350.00"),
+        })
+        self.assertEqual(data["payments"]["count"], 1)
+        self.assertEqual(data["payments"]["collected"], Decimal("30.00"))
+        self.assertEqual(data["payments"]["daily"], [{"day": today, "amount": Decimal("30.00"), "count": 1}])
+        self.assertEqual([row["id"] for row in data["top_debtors"]], [self.ali.id, self.vali.id])
+
+    def test_period_outside_activity(self):
+        response = self.api.get(reverse("company-summary"), {"date_from": "2020-01-02", "date_to": "2020-01-31"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["debts"]["new_count"], 0)
+        self.assertEqual(response.data["payments"]["collected"], Decimal("0.00"))
+        self.assertEqual(response.data["payments"]["daily"], [])
+        # Просрочка считается на сегодня, а не за период
+        self.assertEqual(response.data["debts"]["overdue_amount"], Decimal("70.00"))
 
-# Create your tests here.
+    def test_invalid_period(self):
+        for params in (
+            {"date_from": "01.02.2024"},
+            {"date_to": "2024-02-30"},
+            {"date_from": "2024-03-01", "date_to": "2024-02-01"},
+        ):
+            response = self.api.get(reverse("company-summary"), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.data, params)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from companies.views import CompanySummaryView
+
+urlpatterns = [
+    path('summary/', CompanySummaryView.as_view(), name='company-summary'),
+]
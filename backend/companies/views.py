@@ -1,3 +1,106 @@
-from django.shortcuts import render
+from decimal import Decimal
 
-# Create your views here.
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from clients.models import Client
+from companies.models import CompanyLedger, CompanyLedgerDay
+from shared.utils import parse_date_param
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+TOP_DEBTORS_LIMIT = 5
+
+
+def money_sum(field, **filter_kwargs):
+    return Coalesce(Sum(field, filter=Q(**filter_kwargs) if filter_kwargs else None), ZERO)
+
+
+class CompanySummaryView(APIView):
+    """Сводка для главной страницы.
+
+    Показатели по долгам и платежам берутся из CompanyLedger/CompanyLedgerDay
+    (см. companies.ledger). Период ``date_from``/``date_to`` (по умолчанию —
+    текущий месяц) влияет на новые долги, собранные оплаты и дневной ряд
+    оплат; остальные показатели считаются на текущий момент.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    def get_period(self, request):
+        today = timezone.now().date()
+        date_from = parse_date_param(request, 'date_from') or today.replace(day=1)
+        date_to = parse_date_param(request, 'date_to') or today
+        if date_from > date_to:
+            raise ValidationError({"date_from": "Начало периода позже его конца."})
+        return date_from, date_to
+
+    def get(self, request):
+        company_id = request.user.company_id
+        if company_id is None:
+            raise PermissionDenied("У пользователя нет связанной компании.")
+
+        today = timezone.now().date()
+        date_from, date_to = self.get_period(request)
+
+        clients = Client.objects.filter(company_id=company_id).aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(balanse__gt=0)),
+            total_balance=money_sum('balanse'),
+        )
+
+        # Долги и платежи читаем из сводок, а не из сырых таблиц:
+        # стоимость не растёт вместе с историей компании
+        ledger = CompanyLedger.objects.filter(company_id=company_id).values('outstanding').first()
+        in_period = Q(day__gte=date_from, day__lte=date_to)
+        overdue = Q(day__lt=today)
+        days = CompanyLedgerDay.objects.filter(company_id=company_id)
+        totals = days.filter(in_period | overdue).aggregate(
+            overdue_amount=money_sum('due_amount', day__lt=today),
+            overdue_count=Coalesce(Sum('due_count', filter=overdue), 0),
+            new_count=Coalesce(Sum('new_debt_count', filter=in_period), 0),
+            new_amount=money_sum('new_debt_amount', day__gte=date_from, day__lte=date_to),
+            collected=money_sum('collected', day__gte=date_from, day__lte=date_to),
+            payment_count=Coalesce(Sum('payment_count', filter=in_period), 0),
+        )
+        daily = (
+            days.filter(in_period, payment_count__gt=0)
+            .values('day', amount=F('collected'), count=F('payment_count'))
+            .order_by('day')
+        )
+
+        top_debtors = (
+            Client.objects.filter(company_id=company_id, balanse__gt=0)
+            .order_by('-balanse')
+            .values('id', 'name', 'balanse')[:TOP_DEBTORS_LIMIT]
+        )
+
+        return Response({
+            "period": {"date_from": date_from, "date_to": date_to},
+            "clients": {
+                "total": clients['total'],
+                "active": clients['active'],
+                "total_balance": clients['total_balance'],
+                "average_balance": (
+                    (clients['total_balance'] / clients['total']).quantize(Decimal('0.01'))
+                    if clients['total'] else Decimal('0.00')
+                ),
+            },
+            "debts": {
+                "outstanding": ledger['outstanding'] if ledger else Decimal('0.00'),
+                "overdue_amount": totals['overdue_amount'],
+                "overdue_count": totals['overdue_count'],
+                "new_count": totals['new_count'],
+                "new_amount": totals['new_amount'],
+            },
+            "payments": {
+                "count": totals['payment_count'],
+                "collected": totals['collected'],
+                "daily": list(daily),
+            },
+            "top_debtors": list(top_debtors),
+        })
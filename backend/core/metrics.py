@@ -0,0 +1,116 @@
+"""Метрики запросов, накопленные в памяти процесса.
+
+Заполняются ``core.middleware.RequestMetricsMiddleware`` и отдаются
+``metrics_view`` в текстовом формате Prometheus. Каждый воркер gunicorn
+хранит свои значения.
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+# Верхние границы корзин гистограммы времени ответа, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class ViewStats:
+    __slots__ = ('count', 'duration', 'db_duration', 'queries', 'duplicates', 'response_bytes', 'buckets', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.db_duration = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.response_bytes = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.statuses = defaultdict(int)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewStats)
+
+    def observe(self, view, method, status, duration, db_duration, queries, duplicates, response_bytes):
+        with self._lock:
+            stats = self._views[(view, method)]
+            stats.count += 1
+            stats.duration += duration
+            stats.db_duration += db_duration
+            stats.queries += queries
+            stats.duplicates += duplicates
+            stats.response_bytes += response_bytes
+            stats.statuses[status] += 1
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[index] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Текст в формате Prometheus exposition 0.0.4"""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            def family(name, kind, help_text, samples):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+
+            def labels(view, method, **extra):
+                pairs = {'view': view, 'method': method, **extra}
+                body = ','.join(f'{key}="{_escape(value)}"' for key, value in pairs.items())
+                return '{' + body + '}'
+
+            family('http_requests_total', 'counter', 'Запросы по представлению и статусу.', [
+                f"http_requests_total{labels(view, method, status=str(status))} {count}"
+                for (view, method), stats in views
+                for status, count in sorted(stats.statuses.items())
+            ])
+
+            histogram = []
+            for (view, method), stats in views:
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    histogram.append(f"http_request_duration_seconds_bucket{labels(view, method, le=str(bound))} {count}")
+                histogram.append(f"http_request_duration_seconds_bucket{labels(view, method, le='+Inf')} {stats.count}")
+                histogram.append(f"http_request_duration_seconds_sum{labels(view, method)} {stats.duration:.6f}")
+                histogram.append(f"http_request_duration_seconds_count{labels(view, method)} {stats.count}")
+            family('http_request_duration_seconds', 'histogram', 'Полное время обработки запроса.', histogram)
+
+            for name, attr, help_text in (
+                ('http_request_db_seconds_total', 'db_duration', 'Время в базе данных.'),
+                ('http_request_db_queries_total', 'queries', 'Количество SQL-запросов.'),
+                ('http_request_db_duplicate_queries_total', 'duplicates', 'Повторы одного и того же SQL в запросе (N+1).'),
+                ('http_response_size_bytes_total', 'response_bytes', 'Размер тел ответов.'),
+            ):
+                family(name, 'counter', help_text, [
+                    f"{name}{labels(view, method)} {_number(getattr(stats, attr))}"
+                    for (view, method), stats in views
+                ])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    """Отдаёт накопленные метрики; доступен только при включённых метриках"""
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404
+    token = settings.REQUEST_METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,190 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import routers
+from core.metrics import registry
+
+
+class QueryRecorder:
+    """execute_wrapper, считающий запросы, их время и повторы одного SQL"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements.add(sql)
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+
+def record_queries(recorder):
+    """Подключает ``recorder`` ко всем соединениям с базой"""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+    return stack
+
+
+class RequestMetricsMiddleware:
+    """Время запроса, время и число SQL-запросов, повторы и размер ответа.
+
+    Включается ``REQUEST_METRICS_ENABLED``. Значения уходят в заголовок
+    ``Server-Timing`` и в ``core.metrics.registry`` (см. /api/metrics/).
+    Тело streaming-ответа (экспорт) читается уже после выхода из
+    middleware: его запросы, время и размер попадают в registry, когда
+    поток дочитан или закрыт, а ``Server-Timing`` к этому моменту уже
+    отправлен и описывает только время до первого байта.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        return self.process_response(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        """ASGI: async views не уводятся в поток ради middleware.
+
+        Соединения с базой у каждого потока свои, а ORM из async-кода
+        работает в потоке ``sync_to_async``, поэтому recorder подключается
+        там же.
+        """
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = await sync_to_async(record_queries)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.process_response(request, response, recorder, started)
+
+    def process_response(self, request, response, recorder, started):
+        duration = time.perf_counter() - started
+        response['Server-Timing'] = (
+            f'total;dur={duration * 1000:.1f}, '
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries, {recorder.duplicates} duplicates"'
+        )
+
+        if not response.streaming:
+            self.observe(request, response, recorder, duration, len(response.content))
+        elif response.is_async:
+            response.streaming_content = self.astream(request, response, recorder, started, response.streaming_content)
+        else:
+            response.streaming_content = self.stream(request, response, recorder, started, response.streaming_content)
+        return response
+
+    def stream(self, request, response, recorder, started, content):
+        response_bytes = 0
+        try:
+            with record_queries(recorder):
+                for chunk in content:
+                    response_bytes += len(chunk)
+                    yield chunk
+        finally:
+            self.observe(request, response, recorder, time.perf_counter() - started, response_bytes)
+
+    async def astream(self, request, response, recorder, started, content):
+        response_bytes = 0
+        stack = await sync_to_async(record_queries)(recorder)
+        try:
+            async for chunk in content:
+                response_bytes += len(chunk)
+                yield chunk
+        finally:
+            await sync_to_async(stack.close)()
+            self.observe(request, response, recorder, time.perf_counter() - started, response_bytes)
+
+    def observe(self, request, response, recorder, duration, response_bytes):
+        match = request.resolver_match
+        registry.observe(
+            view=match.view_name if match else 'unresolved',
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            db_duration=recorder.duration,
+            queries=recorder.count,
+            duplicates=recorder.duplicates,
+            response_bytes=response_bytes,
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """Состояние ``core.routers.ReplicaRouter`` на время запроса.
+
+    Включается, если заданы реплики (``DB_REPLICA_URLS``). После успешного
+    небезопасного запроса (или записи в GET) компания на
+    ``DB_PRIMARY_STICKY_SECONDS`` читает только с основной базы.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = routers.RoutingState(request.method)
+        token = routers.activate(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.deactivate(token)
+
+        if self.wrote(state, response):
+            routers.mark_company_write(state.company_id)
+        return self.process_response(state, response)
+
+    async def __acall__(self, request):
+        state = routers.RoutingState(request.method)
+        token = routers.activate(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.deactivate(token)
+
+        if self.wrote(state, response):
+            await sync_to_async(routers.mark_company_write)(state.company_id)
+        return self.process_response(state, response)
+
+    def wrote(self, state, response):
+        return state.company_id is not None and (state.wrote or not state.safe) and response.status_code < 400
+
+    def process_response(self, state, response):
+        if response.streaming:
+            stream_with = routers.astream_with if response.is_async else routers.stream_with
+            response.streaming_content = stream_with(state, response.streaming_content)
+        return response
@@ -0,0 +1,114 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from shared.cache import get_cache
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Состояние маршрутизации текущего запроса (None — вне HTTP-запроса)
+_request_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Куда читать в рамках одного HTTP-запроса.
+
+    Безопасный запрос читает с одной случайно выбранной реплики, но только
+    после того, как стала известна компания (``bind_company``) и она не
+    писала в последние ``DB_PRIMARY_STICKY_SECONDS``. Любая запись в запросе
+    переключает все последующие чтения на основную базу.
+    """
+
+    def __init__(self, method):
+        self.safe = method in SAFE_METHODS
+        self.replica = random.choice(settings.DATABASE_REPLICAS)
+        self.company_id = None
+        self.sticky = True
+        self.wrote = False
+
+    @property
+    def use_replica(self):
+        return (
+            self.safe and not self.sticky and not self.wrote
+            # select_for_update и чтения внутри транзакции — только с основной
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        )
+
+
+def sticky_key(company_id):
+    return f'db-primary:{company_id}'
+
+
+def activate(state):
+    return _request_state.set(state)
+
+
+def deactivate(token):
+    _request_state.reset(token)
+
+
+def bind_company(company_id):
+    """Вызывается после аутентификации: решает, можно ли компании читать с реплики"""
+    state = _request_state.get()
+    if state is None or company_id is None:
+        return
+    state.company_id = company_id
+    if state.safe:
+        state.sticky = get_cache().get(sticky_key(company_id)) is not None
+
+
+def mark_company_write(company_id):
+    """Следующие DB_PRIMARY_STICKY_SECONDS компания читает с основной базы.
+
+    Ставится ``ReplicaRoutingMiddleware`` после записи в запросе и
+    ``shared.cache.bump_company_version`` после коммита любой записи.
+    """
+    get_cache().set(sticky_key(company_id), 1, settings.DB_PRIMARY_STICKY_SECONDS)
+
+
+def stream_with(state, content):
+    """Отдаёт streaming-ответ (экспорт) с маршрутизацией его запроса:
+    тело читается уже после выхода из middleware"""
+    previous = _request_state.get()
+    _request_state.set(state)
+    try:
+        yield from content
+    finally:
+        _request_state.set(previous)
+
+
+async def astream_with(state, content):
+    """То же для асинхронного тела streaming-ответа"""
+    previous = _request_state.get()
+    _request_state.set(state)
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        _request_state.set(previous)
+
+
+class ReplicaRouter:
+    """Безопасные чтения HTTP-запросов — на реплики, остальное — на основную базу"""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and state.use_replica:
+            return state.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема на реплики приходит репликацией
+        return db == DEFAULT_DB_ALIAS
@@ -19,12 +19,16 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics_view
+
 urlpatterns = [
     path('api/admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/clients/', include('clients.urls')),
     path('api/debts/', include('debts.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/companies/', include('companies.urls')),
+    path('api/metrics/', metrics_view, name='metrics'),
 ]
 
 
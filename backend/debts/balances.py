@@ -0,0 +1,317 @@
+from collections import Counter, namedtuple
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from clients.models import Client
+from debts.models import Debt
+from payments.models import Payment
+
+CENT = Decimal('0.01')
+
+
+class BalanceError(ValueError):
+    """Изменение вывело бы остаток долга за пределы [0, total_amount]"""
+
+
+# Состояние долга после изменения остатка (из RETURNING)
+DebtBalance = namedtuple('DebtBalance', 'pk client_id company_id total_amount remaining_amount is_paid due_date')
+
+DEBT_TABLE = Debt._meta.db_table
+CLIENT_TABLE = Client._meta.db_table
+PAYMENT_TABLE = Payment._meta.db_table
+
+# Остаток меняется только если остаётся в пределах [0, total_amount];
+# ROUND — для SQLite, где DecimalField хранится как REAL
+DEBT_UPDATE = f"""
+    UPDATE {DEBT_TABLE}
+    SET remaining_amount = ROUND(remaining_amount + %s, 2),
+        is_paid = ROUND(remaining_amount + %s, 2) = 0,
+        updated_at = %s
+    WHERE id = %s AND ROUND(remaining_amount + %s, 2) BETWEEN 0 AND total_amount
+    RETURNING id, client_id, company_id, total_amount, remaining_amount, is_paid, due_date
+"""
+
+CLIENT_UPDATE = f"""
+    UPDATE {CLIENT_TABLE} SET balanse = ROUND(balanse + %s, 2), updated_at = %s WHERE id = %s
+"""
+
+# PostgreSQL: долг и клиент одним запросом. Клиент обновляется из строки
+# долга, поэтому блокировки берутся в том же порядке debt → client
+DEBT_AND_CLIENT_UPDATE = f"""
+    WITH debt AS ({DEBT_UPDATE}),
+    client AS (
+        UPDATE {CLIENT_TABLE} SET balanse = balanse + %s, updated_at = %s
+        FROM debt WHERE {CLIENT_TABLE}.id = debt.client_id
+    )
+    SELECT * FROM debt
+"""
+
+
+def money(value):
+    return Decimal(str(value)).quantize(CENT)
+
+
+def db_value(model, field, value):
+    """Значение для сырого SQL: UUID и даты в SQLite хранятся по-своему"""
+    return model._meta.get_field(field).get_db_prep_value(value, connection)
+
+
+def to_balance(row):
+    pk, client_id, company_id, total_amount, remaining_amount, is_paid, due_date = row
+    field = Debt._meta.get_field
+    return DebtBalance(
+        pk, field('client').to_python(client_id), field('company').to_python(company_id),
+        money(total_amount), money(remaining_amount), bool(is_paid), field('due_date').to_python(due_date),
+    )
+
+
+def change_remaining(debt_id, delta):
+    """Прибавляет ``delta`` к остатку долга и балансу его клиента.
+
+    Отрицательная ``delta`` — платёж, положительная — возврат. Проверка
+    и изменение — один условный UPDATE, поэтому параллельные платежи не
+    переплачивают долг без SELECT ... FOR UPDATE. Возвращает ``DebtBalance``
+    или None, если долга нет или остаток вышел бы за [0, total_amount].
+    """
+    now = db_value(Debt, 'updated_at', timezone.now())
+    debt_params = [delta, delta, now, debt_id, delta]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(DEBT_AND_CLIENT_UPDATE, [*debt_params, delta, now])
+            row = cursor.fetchone()
+        else:
+            cursor.execute(DEBT_UPDATE, debt_params)
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute(CLIENT_UPDATE, [delta, now, row[1]])
+    return None if row is None else to_balance(row)
+
+
+def change_client_balance(client_id, delta):
+    """Прибавляет ``delta`` к балансу клиента; возвращает ``(компания, новый баланс)``"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {CLIENT_TABLE} SET balanse = ROUND(balanse + %s, 2), updated_at = %s "
+            f"WHERE id = %s RETURNING company_id, balanse",
+            [delta, db_value(Client, 'updated_at', timezone.now()), db_value(Client, 'id', client_id)],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None, None
+    return Client._meta.get_field('company').to_python(row[0]), money(row[1])
+
+
+def change_total(debt_id, total_amount):
+    """Меняет сумму долга: разница переносится на остаток и баланс клиента.
+
+    Возвращает ``(DebtBalance, прежние total_amount/due_date/is_paid)`` или
+    None, если остаток стал бы отрицательным (по долгу уже заплачено больше).
+    """
+    old = Debt.objects.select_for_update().values('total_amount', 'due_date', 'is_paid').get(pk=debt_id)
+    delta = total_amount - old['total_amount']
+    now = db_value(Debt, 'updated_at', timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {DEBT_TABLE}
+            SET total_amount = %s,
+                remaining_amount = ROUND(remaining_amount + %s, 2),
+                is_paid = ROUND(remaining_amount + %s, 2) = 0,
+                updated_at = %s
+            WHERE id = %s AND ROUND(remaining_amount + %s, 2) >= 0
+            RETURNING id, client_id, company_id, total_amount, remaining_amount, is_paid, due_date
+            """,
+            [total_amount, delta, delta, now, debt_id, delta],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        if delta:
+            cursor.execute(CLIENT_UPDATE, [delta, now, row[1]])
+    return to_balance(row), old
+
+
+def move_debt(debt_id, client_id):
+    """Переносит остаток долга с баланса прежнего клиента на баланс ``client_id``.
+
+    Возвращает компанию нового клиента или None, если клиент не менялся.
+    Перенос в другую компанию не поддерживается: сводки компаний разошлись бы.
+    """
+    old = Debt.objects.select_for_update().values('client_id', 'company_id', 'remaining_amount').get(pk=debt_id)
+    if old['client_id'] == client_id:
+        return None
+    change_client_balance(old['client_id'], -old['remaining_amount'])
+    company_id, _ = change_client_balance(client_id, old['remaining_amount'])
+    if company_id != old['company_id']:
+        raise BalanceError("Долг можно перенести только клиенту той же компании.")
+    return company_id
+
+
+def payment_days(debt_id):
+    """Платежи долга по дням: тройки (день, сумма, число)"""
+    return list(
+        Payment.objects.filter(debt_id=debt_id).annotate(day=TruncDate('created_at')).order_by()
+        .values('day').annotate(amount=Sum('amount'), count=Count('id'))
+        .values_list('day', 'amount', 'count')
+    )
+
+
+def company_filter(alias, company_id):
+    """Условие на компанию строки: у части старых строк company_id пустой"""
+    if company_id is None:
+        return f'{alias}.company_id IS NULL', []
+    return f'{alias}.company_id = %s', [db_value(Debt, 'company', company_id)]
+
+
+def fetch_rows(sql, params, fields):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(zip(fields, row)) for row in cursor.fetchall()]
+
+
+def debt_mismatches(company_id):
+    """Долги компании, у которых остаток не равен сумме минус платежи или
+    is_paid не совпадает с остатком.
+
+    Один запрос: платежи компании агрегируются GROUP BY по долгу и
+    соединяются с долгами, поэтому сверка видит один согласованный снимок.
+    """
+    where, params = company_filter('d', company_id)
+    rows = fetch_rows(
+        f"""
+        SELECT d.id, d.remaining_amount, d.total_amount - COALESCE(p.paid, 0), d.is_paid
+        FROM {DEBT_TABLE} d
+        LEFT JOIN (
+            SELECT p.debt_id, SUM(p.amount) AS paid
+            FROM {PAYMENT_TABLE} p JOIN {DEBT_TABLE} d ON d.id = p.debt_id
+            WHERE {where}
+            GROUP BY p.debt_id
+        ) p ON p.debt_id = d.id
+        WHERE {where}
+          AND (d.remaining_amount <> ROUND(d.total_amount - COALESCE(p.paid, 0), 2)
+               OR d.is_paid <> (d.remaining_amount = 0))
+        ORDER BY d.id
+        """,
+        params * 2,
+        ('pk', 'remaining_amount', 'expected', 'is_paid'),
+    )
+    field = Debt._meta.get_field
+    for row in rows:
+        row.update(
+            pk=field('id').to_python(row['pk']), company_id=company_id, is_paid=bool(row['is_paid']),
+            remaining_amount=money(row['remaining_amount']), expected=money(row['expected']),
+        )
+    return rows
+
+
+def client_mismatches(company_id):
+    """Клиенты компании, у которых баланс не равен сумме остатков их долгов"""
+    where, params = company_filter('c', company_id)
+    rows = fetch_rows(
+        f"""
+        SELECT c.id, c.balanse, COALESCE(d.remaining, 0)
+        FROM {CLIENT_TABLE} c
+        LEFT JOIN (
+            SELECT d.client_id, SUM(d.remaining_amount) AS remaining
+            FROM {DEBT_TABLE} d JOIN {CLIENT_TABLE} c ON c.id = d.client_id
+            WHERE {where}
+            GROUP BY d.client_id
+        ) d ON d.client_id = c.id
+        WHERE {where} AND c.balanse <> ROUND(COALESCE(d.remaining, 0), 2)
+        ORDER BY c.id
+        """,
+        params * 2,
+        ('pk', 'balanse', 'expected'),
+    )
+    for row in rows:
+        row.update(
+            pk=Client._meta.get_field('id').to_python(row['pk']), company_id=company_id,
+            balanse=money(row['balanse']), expected=money(row['expected']),
+        )
+    return rows
+
+
+def id_list(model, ids):
+    return ', '.join(['%s'] * len(ids)), [db_value(model, 'id', pk) for pk in ids]
+
+
+def repair_debts(debt_ids):
+    """Пересчитывает остаток и is_paid долгов по их платежам; возвращает id исправленных.
+
+    Долги блокируются с SKIP LOCKED: долг, который сейчас меняет платёж,
+    пропускается до следующего прогона, а не ждёт и не ловит взаимоблокировку.
+    Пересчёт — отдельный запрос уже после блокировки, поэтому он видит все
+    закоммиченные платежи; незакоммиченный платёж ещё не списан с остатка и
+    спишется поверх исправленного значения. Долги, по которым заплачено
+    больше суммы, не трогаются.
+    """
+    with transaction.atomic():
+        locked = list(
+            Debt.objects.select_for_update(skip_locked=True).filter(pk__in=debt_ids)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        if not locked:
+            return []
+        placeholders, params = id_list(Debt, locked)
+        expected = (
+            f"ROUND(total_amount - COALESCE((SELECT SUM(amount) FROM {PAYMENT_TABLE} "
+            f"WHERE debt_id = {DEBT_TABLE}.id), 0), 2)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {DEBT_TABLE}
+                SET remaining_amount = {expected}, is_paid = {expected} = 0, updated_at = %s
+                WHERE id IN ({placeholders})
+                  AND (remaining_amount <> {expected} OR is_paid <> (remaining_amount = 0))
+                  AND {expected} BETWEEN 0 AND total_amount
+                RETURNING id
+                """,
+                [db_value(Debt, 'updated_at', timezone.now()), *params],
+            )
+            return [Debt._meta.get_field('id').to_python(row[0]) for row in cursor.fetchall()]
+
+
+def repair_clients(client_ids):
+    """Пересчитывает балансы клиентов по остаткам их долгов; возвращает id исправленных.
+
+    Порядок блокировок тот же, что у платежей: сначала долги клиентов, потом
+    сами клиенты, оба раза с SKIP LOCKED. Клиент пропускается, если занят он
+    или хотя бы один его долг.
+    """
+    with transaction.atomic():
+        locked_debts = Counter(
+            Debt.objects.select_for_update(skip_locked=True).filter(client_id__in=client_ids)
+            .order_by('pk').values_list('client_id', flat=True)
+        )
+        debt_counts = (
+            Debt.objects.filter(client_id__in=client_ids).order_by().values('client_id')
+            .annotate(count=Count('id')).values_list('client_id', 'count')
+        )
+        busy = {client_id for client_id, count in debt_counts if locked_debts[client_id] != count}
+        locked = list(
+            Client.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=[pk for pk in client_ids if pk not in busy])
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        if not locked:
+            return []
+        placeholders, params = id_list(Client, locked)
+        expected = (
+            f"ROUND(COALESCE((SELECT SUM(remaining_amount) FROM {DEBT_TABLE} "
+            f"WHERE client_id = {CLIENT_TABLE}.id), 0), 2)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {CLIENT_TABLE} SET balanse = {expected}, updated_at = %s
+                WHERE id IN ({placeholders}) AND balanse <> {expected}
+                RETURNING id
+                """,
+                [db_value(Client, 'updated_at', timezone.now()), *params],
+            )
+            return [Client._meta.get_field('id').to_python(row[0]) for row in cursor.fetchall()]
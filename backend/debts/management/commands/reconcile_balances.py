@@ -0,0 +1,144 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from companies.models import Company
+from debts.balances import client_mismatches, debt_mismatches, repair_clients, repair_debts
+from shared.cache import bump_company_version
+
+# Сколько расхождений печатать подробно
+MAX_REPORTED = 20
+
+
+@dataclass
+class CompanyReport:
+    """Итог сверки одной компании: найденные расхождения (первые MAX_REPORTED) и исправленные"""
+    company_id: object
+    debts: list
+    debt_count: int
+    clients: list
+    client_count: int
+    fixed_debts: int = 0
+    fixed_clients: int = 0
+
+
+def batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield [row['pk'] for row in rows[start:start + size]]
+
+
+def reconcile_company(company_id, repair=False, batch_size=500, worker=False):
+    """Сверяет (и при ``repair`` исправляет) остатки долгов и балансы клиентов компании.
+
+    Сначала долги, потом клиенты: исправленный остаток долга меняет
+    ожидаемый баланс его клиента. ``worker=True`` — процесс пула: в конце
+    закрывает своё соединение с базой.
+    """
+    try:
+        debts = debt_mismatches(company_id)
+        fixed_debts = 0
+        if repair:
+            # Каждая пачка — своя короткая транзакция
+            fixed_debts = sum(len(repair_debts(ids)) for ids in batches(debts, batch_size))
+
+        clients = client_mismatches(company_id)
+        fixed_clients = 0
+        if repair:
+            fixed_clients = sum(len(repair_clients(ids)) for ids in batches(clients, batch_size))
+
+        if fixed_debts and company_id is not None:
+            call_command('rebuild_ledger', company=str(company_id), stdout=io.StringIO())
+        if fixed_debts or fixed_clients:
+            bump_company_version(company_id)
+        return CompanyReport(
+            company_id, debts[:MAX_REPORTED], len(debts), clients[:MAX_REPORTED], len(clients),
+            fixed_debts, fixed_clients,
+        )
+    finally:
+        if worker:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет остатки долгов с суммой минус платежи и балансы клиентов с суммой "
+        "остатков их долгов по компаниям (--workers процессов); с --repair исправляет "
+        "расхождения пачками. Завершается с ошибкой, если остались расхождения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', action='append', help="ID компании (можно несколько; по умолчанию — все)")
+        parser.add_argument('--repair', action='store_true', help="Исправить найденные расхождения")
+        parser.add_argument('--workers', type=int, default=1, help="Процессов для сверки компаний параллельно")
+        parser.add_argument('--batch-size', type=int, default=500, help="Строк в одной транзакции исправления")
+
+    def handle(self, *args, company=None, repair=False, workers=1, batch_size=500, **options):
+        companies = Company.objects.order_by('pk')
+        if company:
+            companies = companies.filter(pk__in=company)
+        company_ids = list(companies.values_list('pk', flat=True))
+        if not company:
+            # Строки без компании — отдельная порция
+            company_ids.append(None)
+
+        self.reported = 0
+        totals = dict.fromkeys(('debts', 'clients', 'fixed_debts', 'fixed_clients'), 0)
+        for report in self.run(company_ids, repair, batch_size, workers):
+            self.write_report(report)
+            totals['debts'] += report.debt_count
+            totals['clients'] += report.client_count
+            totals['fixed_debts'] += report.fixed_debts
+            totals['fixed_clients'] += report.fixed_clients
+
+        found = f"долгов {totals['debts']}, клиентов {totals['clients']}"
+        if not repair:
+            if totals['debts'] or totals['clients']:
+                raise CommandError(f"Расхождений: {found}")
+            self.stdout.write(self.style.SUCCESS("Остатки и балансы совпадают с платежами."))
+            return
+
+        self.stdout.write(f"Расхождений: {found}; исправлено: долгов {totals['fixed_debts']}, "
+                          f"клиентов {totals['fixed_clients']}")
+        if totals['fixed_debts'] < totals['debts'] or totals['fixed_clients'] < totals['clients']:
+            # Занятые строки пропущены (SKIP LOCKED), переплаченные долги не трогаются
+            raise CommandError("Исправлено не всё: строки были заняты или долг переплачен, запустите повторно.")
+        self.stdout.write(self.style.SUCCESS("Остатки и балансы исправлены."))
+
+    def run(self, company_ids, repair, batch_size, workers):
+        if workers <= 1:
+            for company_id in company_ids:
+                yield reconcile_company(company_id, repair, batch_size)
+            return
+
+        # Дочерние процессы не должны унаследовать открытые соединения
+        connections.close_all()
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+        with executor:
+            futures = [
+                executor.submit(reconcile_company, company_id, repair, batch_size, worker=True)
+                for company_id in company_ids
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def write_report(self, report):
+        for row in report.debts:
+            if self.reported >= MAX_REPORTED:
+                break
+            self.reported += 1
+            self.stdout.write(
+                f"долг {row['pk']} ({report.company_id}): остаток {row['remaining_amount']}, "
+                f"ожидалось {row['expected']}, is_paid={row['is_paid']}"
+            )
+        for row in report.clients:
+            if self.reported >= MAX_REPORTED:
+                break
+            self.reported += 1
+            self.stdout.write(
+                f"клиент {row['pk']} ({report.company_id}): баланс {row['balanse']}, ожидалось {row['expected']}"
+            )
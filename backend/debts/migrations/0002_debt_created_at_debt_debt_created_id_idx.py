@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_client_created_id_idx'),
+        ('debts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debt',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата создания'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['created_at', 'id'], name='debt_created_id_idx'),
+        ),
+    ]
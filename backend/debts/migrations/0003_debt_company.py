@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_company_from_client(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    Debt = apps.get_model('debts', 'Debt')
+    Debt.objects.update(
+        company_id=Subquery(Client.objects.filter(pk=OuterRef('client_id')).values('company_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_client_company_index'),
+        ('companies', '0002_ledger'),
+        ('debts', '0002_debt_created_at_debt_debt_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='debt',
+            name='debt_created_id_idx',
+        ),
+        migrations.AddField(
+            model_name='debt',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='debts', to='companies.company', verbose_name='Компания'),
+        ),
+        migrations.RunPython(copy_company_from_client, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['company', 'created_at', 'id'], name='debt_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['company', 'due_date'], name='debt_unpaid_due_idx'),
+        ),
+    ]
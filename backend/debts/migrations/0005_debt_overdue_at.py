@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:36
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_existing_overdue(apps, schema_editor):
+    """Уже просроченные долги считаем отмеченными: напоминания — только по новым"""
+    Debt = apps.get_model('debts', 'Debt')
+    Debt.objects.filter(is_paid=False, due_date__lt=timezone.localdate()).update(overdue_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_client_search_trgm'),
+        ('companies', '0002_ledger'),
+        ('debts', '0004_debt_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debt',
+            name='overdue_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отмечен просроченным'),
+        ),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(condition=models.Q(('is_paid', False), ('overdue_at__isnull', True)), fields=['due_date', 'id'], name='debt_overdue_sweep_idx'),
+        ),
+        migrations.RunPython(mark_existing_overdue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def spread_legacy_created_at(apps, schema_editor):
+    """Старые долги получили один created_at при добавлении поля (0002).
+
+    CursorPagination различает позиции только по created_at, поэтому на
+    группе одинаковых значений курсор вырождается в OFFSET по всей группе.
+    Долгам группы назначаются различные значения на микросекунды раньше
+    общего, в порядке id (порядок создания).
+    """
+    Debt = apps.get_model('debts', 'Debt')
+    shared = (
+        Debt.objects.order_by().values('created_at').annotate(count=Count('id'))
+        .filter(count__gt=1).values_list('created_at', flat=True)
+    )
+    for created_at in list(shared):
+        ids = list(Debt.objects.filter(created_at=created_at).order_by('-id').values_list('id', flat=True))
+        debts = [Debt(id=pk, created_at=created_at - timedelta(microseconds=offset)) for offset, pk in enumerate(ids)]
+        Debt.objects.bulk_update(debts, ['created_at'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debts', '0005_debt_overdue_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_legacy_created_at, migrations.RunPython.noop),
+    ]
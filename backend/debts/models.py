@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.timezone import now
 from datetime import timedelta
 from clients.models import Client
+from companies.ledger import record_debt_removal, record_debt_total_change, record_debts
+from shared.cache import bump_company_version
 
 def default_due_date():
     return now().date() + timedelta(days=30)
@@ -9,20 +11,93 @@ def default_due_date():
 class Debt(models.Model):
     """Задолженности клиентов"""
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="debts", verbose_name="Клиент")
+    # Копия client.company: списки компании фильтруются без JOIN на клиентов
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.CASCADE,
+        related_name='debts',
+        null=True,
+        blank=True,
+        verbose_name="Компания",
+    )
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Сумма долга")
     remaining_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Остаток долга")
     due_date = models.DateField(verbose_name="Срок оплаты", default=default_due_date)
     is_paid = models.BooleanField(default=False, verbose_name="Оплачено")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    # Ставится командой sweep_overdue, когда долг впервые попал в просрочку
+    overdue_at = models.DateTimeField(null=True, blank=True, verbose_name="Отмечен просроченным")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'created_at', 'id'], name='debt_company_created_idx'),
+            # Просроченные: company + due_date < today среди неоплаченных
+            models.Index(
+                fields=['company', 'due_date'],
+                condition=models.Q(is_paid=False),
+                name='debt_unpaid_due_idx',
+            ),
+            # Очередь для sweep_overdue: неоплаченные и ещё не отмеченные
+            models.Index(
+                fields=['due_date', 'id'],
+                condition=models.Q(is_paid=False, overdue_at__isnull=True),
+                name='debt_overdue_sweep_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        """Автоматически заполняет остаток долга и отмечает оплату"""
-        if not self.id:  # Если создается новый объект
+        """Новый долг прибавляется к балансу клиента, изменение суммы — разницей,
+        смена клиента переносит остаток на баланс нового клиента.
+
+        Остаток и оплату пишет база (``debts.balances``): значения из Python
+        для существующего долга могли устареть из-за параллельных платежей.
+        """
+        from debts import balances
+
+        update_fields = kwargs.get('update_fields')
+        if self.id:
+            with transaction.atomic():
+                if update_fields is None or 'total_amount' in update_fields:
+                    changed = balances.change_total(self.pk, self.total_amount)
+                    if changed is None:
+                        raise balances.BalanceError("Сумма долга меньше уже оплаченной.")
+                    balance, old = changed
+                    self.remaining_amount = balance.remaining_amount
+                    self.is_paid = balance.is_paid
+                    record_debt_total_change(
+                        self.company_id, self, self.total_amount - old['total_amount'], old['due_date'], old['is_paid']
+                    )
+                if update_fields is None or 'client' in update_fields:
+                    balances.move_debt(self.pk, self.client_id)
+                super().save(*args, **kwargs)
+            bump_company_version(self.company_id)
+            return
+
+        # Новый долг: баланс клиента — одним UPDATE (строка клиента
+        # блокируется до конца транзакции, параллельный платёж подождёт)
+        with transaction.atomic():
+            self.company_id, balanse = balances.change_client_balance(self.client_id, self.total_amount)
+            if Debt.client.is_cached(self):
+                self.client.balanse = balanse
             self.remaining_amount = self.total_amount
-            self.client.balanse += self.total_amount
-            self.client.save()
-        if self.remaining_amount == 0:
-            self.is_paid = True 
-        super().save(*args, **kwargs)
+            self.is_paid = self.remaining_amount == 0
+            super().save(*args, **kwargs)
+            record_debts(self.company_id, [self])
+        bump_company_version(self.company_id)
+
+    def delete(self, *args, **kwargs):
+        """Остаток уходит с баланса клиента, долг и его платежи — из сводки"""
+        from debts import balances
+
+        with transaction.atomic():
+            debt = Debt.objects.select_for_update().filter(pk=self.pk).first()
+            if debt is not None:
+                balances.change_client_balance(debt.client_id, -debt.remaining_amount)
+                record_debt_removal(debt.company_id, debt, balances.payment_days(debt.pk))
+            result = super().delete(*args, **kwargs)
+        bump_company_version(self.company_id)
+        return result
 
     def __str__(self):
         return f"{self.client.name} - {self.remaining_amount} руб."
@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from debts.balances import BalanceError
 from debts.models import Debt
 from clients.models import Client
 from payments.models import Payment
+from payments.services import PaymentExceedsDebtError
 from datetime import date
+from shared.compact import CompactRows
 
 
 class DebtSerializer(serializers.ModelSerializer):
@@ -12,18 +15,18 @@ class DebtSerializer(serializers.ModelSerializer):
     class Meta:
         model = Debt
         fields = '__all__'
-        read_only_fields = ('is_paid', 'remaining_amount')
-        depth = 1
+        read_only_fields = ('is_paid', 'remaining_amount', 'company', 'overdue_at')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         request = self.context.get('request')
-        if request and hasattr(request.user, 'company'):
-            self.fields['client'].queryset = Client.objects.filter(company=request.user.company)
+        if request and hasattr(request.user, 'company_id'):
+            self.fields['client'].queryset = Client.objects.filter(company_id=request.user.company_id)
 
     def validate(self, attrs):
         """Проверка на отрицательные значения"""
-        if attrs.get('total_amount') < 0:
+        total_amount = attrs.get('total_amount')
+        if total_amount is not None and total_amount < 0:
             raise serializers.ValidationError("Сумма долга не может быть отрицательной.")
         
         due_date = attrs.get('due_date')
@@ -32,8 +35,17 @@ class DebtSerializer(serializers.ModelSerializer):
     
         return attrs
 
+    def update(self, instance, validated_data):
+        """Новая сумма долга меняет остаток и баланс клиента на разницу"""
+        try:
+            return super().update(instance, validated_data)
+        except BalanceError as exc:
+            raise serializers.ValidationError({"total_amount": str(exc)})
+
+
+# ?view=compact: колонки карточки долга, клиент — только id
+DEBT_COMPACT = CompactRows(Debt, ('id', 'client', 'total_amount', 'remaining_amount', 'due_date', 'is_paid'))
 
-    
 
 class PaymentSerializer(serializers.ModelSerializer):
     # Add a field to include debt.total_amount
@@ -52,11 +64,14 @@ class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = "__all__"  # Includes all fields from Payment model
-        read_only_fields = ["user", "debt_total_amount"]  # Make user and debt_total_amount read-only
+        read_only_fields = ["user", "company", "debt_total_amount"]  # Make user and debt_total_amount read-only
 
     def create(self, validated_data):
         """Устанавливаем текущего пользователя автоматически"""
         request = self.context.get("request")
         if request and request.user:
-            validated_data["user"] = request.user
-        return super().create(validated_data)
\ No newline at end of file
+            validated_data["user_id"] = request.user.id
+        try:
+            return super().create(validated_data)
+        except PaymentExceedsDebtError as exc:
+            raise serializers.ValidationError({"amount": str(exc)})
\ No newline at end of file
@@ -1,3 +1,283 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clients.models import Client
+from companies.models import Company
+from debts.models import Debt
+from payments.models import Payment
+from users.models import User
+
+
+class DebtDetailPaymentQueryCountTest(TestCase):
+    """Количество запросов не зависит от числа платежей по долгу"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=company)
+        self.debt = Debt.objects.create(client=client, total_amount=Decimal("1000.00"))
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_query_count_is_constant(self):
+        for _ in range(20):
+            Payment.objects.create(debt=self.debt, amount=Decimal("10.00"), user=self.user)
+
+        url = reverse("debt-payments", kwargs={"id": self.debt.id})
+        # ETag, долг, платежи
+        with self.assertNumQueries(3):
+            response = self.api.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(response.data[0]["user_email"], "seller@example.com")
+
+    def test_etag_follows_debt_and_user(self):
+        Payment.objects.create(debt=self.debt, amount=Decimal("10.00"), user=self.user)
+        url = reverse("debt-payments", kwargs={"id": self.debt.id})
+        etag = self.api.get(url)["ETag"]
+
+        self.debt.total_amount = Decimal("1500.00")
+        self.debt.save()
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["debt_total_amount"], "1500.00")
+
+        self.user.email = "new@example.com"
+        self.user.save()
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["user_email"], "new@example.com")
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+class CompactListTest(TestCase):
+    """?view=compact отдаёт те же значения, что и полный сериализатор, только нужные колонки"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=company)
+        debt = Debt.objects.create(client=client, total_amount=Decimal("1000"))
+        Payment.objects.create(debt=debt, amount=Decimal("250.5"), user=self.user)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_compact_matches_full(self):
+        for url in (reverse("debt-list-create"), reverse("payment-list"), reverse("client-list")):
+            full = self.api.get(url).json()
+            compact = self.api.get(url, {"view": "compact"}).json()
+            self.assertEqual(len(compact), len(full))
+            for full_row, compact_row in zip(full, compact):
+                shared = set(compact_row) & set(full_row)
+                self.assertLess(shared, set(full_row))
+                self.assertEqual({key: full_row[key] for key in shared}, {key: compact_row[key] for key in shared})
+
+    def test_compact_page(self):
+        response = self.api.get(reverse("debt-list-create"), {"view": "compact", "page_size": 1})
+        self.assertEqual(response.json()["results"][0]["remaining_amount"], "749.50")
+
+
+class AsyncReadViewTest(TestCase):
+    """Async-эндпоинты отдают то же, что синхронные, и проверяют токен сами"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=company)
+        self.debt = Debt.objects.create(client=client, total_amount=Decimal("1000"))
+        Payment.objects.create(debt=self.debt, amount=Decimal("250.5"), user=self.user)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_matches_sync_views(self):
+        pairs = [
+            (reverse("debt-list-create"), reverse("debt-list-async")),
+            (reverse("debt-payments", kwargs={"id": self.debt.id}), reverse("debt-payments-async", kwargs={"id": self.debt.id})),
+            (reverse("payment-list"), reverse("payment-list-async")),
+        ]
+        for sync_url, async_url in pairs:
+            for params in ({}, {"view": "compact"}):
+                response = self.api.get(async_url, params)
+                self.assertEqual(response.status_code, 200, async_url)
+                self.assertEqual(response.json(), self.api.get(sync_url, params).json(), async_url)
+
+        etag = response["ETag"]
+        self.assertEqual(self.api.get(async_url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_requires_token(self):
+        self.api.credentials()
+        self.assertEqual(self.api.get(reverse("debt-list-async")).status_code, 401)
+
+    def test_invalid_token_matches_drf_shape(self):
+        self.api.credentials(HTTP_AUTHORIZATION="Bearer broken")
+        response = self.api.get(reverse("debt-list-async"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), self.api.get(reverse("debt-list-create")).json())
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+    def test_payments_etag_follows_debt(self):
+        url = reverse("debt-payments-async", kwargs={"id": self.debt.id})
+        etag = self.api.get(url)["ETag"]
+        self.debt.total_amount = Decimal("1500.00")
+        self.debt.save()
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["debt_total_amount"], "1500.00")
+
+
+class CursorPaginationTest(TestCase):
+    """?cursor=/?page_size= листают по (created_at, id) без пропусков и повторов"""
+
+    def setUp(self):
+        company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+        self.client_obj = Client.objects.create(name="Али", phone="998901112233", company=company)
+        self.debts = [Debt.objects.create(client=self.client_obj, total_amount=Decimal("10.00")) for _ in range(7)]
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def walk(self, **params):
+        ids, response = [], self.api.get(reverse("debt-list-create"), params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [debt["id"] for debt in response.data["results"]]
+            if not response.data["next"]:
+                return ids
+            response = self.api.get(response.data["next"])
+
+    def test_pages_match_full_list(self):
+        full = [debt["id"] for debt in self.api.get(reverse("debt-list-create")).data]
+        self.assertEqual(self.walk(page_size=3), [debt.id for debt in reversed(self.debts)])
+        self.assertEqual(sorted(full), sorted(debt.id for debt in self.debts))
+        self.assertEqual(len(self.api.get(reverse("debt-list-create"), {"page_size": 2}).data["results"]), 2)
+
+    def test_equal_created_at(self):
+        # Одинаковый created_at у старых долгов: позиция уточняется по id
+        Debt.objects.update(created_at=timezone.now())
+        self.assertEqual(sorted(self.walk(page_size=3)), sorted(debt.id for debt in self.debts))
+
+    def test_new_rows_do_not_shift_pages(self):
+        first = self.api.get(reverse("debt-list-create"), {"page_size": 3}).data
+        Debt.objects.create(client=self.client_obj, total_amount=Decimal("10.00"))
+        rest = self.api.get(first["next"]).data["results"]
+        self.assertEqual(rest[0]["id"], self.debts[3].id)
+
+    def test_overdue_filter_with_cursor(self):
+        overdue = self.debts[1::2]
+        Debt.objects.filter(pk__in=[debt.pk for debt in overdue]).update(due_date=timezone.localdate() - timedelta(days=1))
+        ids = self.walk(filter="overdue", page_size=2)
+        self.assertEqual(ids, [debt.id for debt in reversed(overdue)])
+
+
+class DistinctCreatedAtMigrationTest(TransactionTestCase):
+    """0006 разводит одинаковые created_at старых долгов в порядке id"""
+
+    migrate_from = [("debts", "0005_debt_overdue_at")]
+    migrate_to = [("debts", "0006_debt_distinct_created_at")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        company = apps.get_model("companies", "Company").objects.create(name="Магазин")
+        client = apps.get_model("clients", "Client").objects.create(name="Али", phone="998901112233", company=company)
+        HistoricalDebt = apps.get_model("debts", "Debt")
+        legacy = timezone.now()
+        for _ in range(3):
+            HistoricalDebt.objects.create(
+                client=client, company=company, total_amount=10, remaining_amount=10, created_at=legacy,
+            )
+        HistoricalDebt.objects.update(created_at=legacy)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        created = list(Debt.objects.order_by("id").values_list("created_at", flat=True))
+        self.assertEqual(len(set(created)), 3)
+        self.assertEqual(created, sorted(created))
+        self.assertEqual(created[-1], legacy)
+
+
+class CompanyBackfillMigrationTest(TransactionTestCase):
+    """debts 0003 и payments 0004 копируют company_id клиента в долги и оплаты"""
+
+    migrate_from = [("debts", "0002_debt_created_at_debt_debt_created_id_idx"), ("payments", "0003_payment_payment_created_id_idx")]
+    migrate_to = [("debts", "0003_debt_company"), ("payments", "0004_payment_company")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        Company = apps.get_model("companies", "Company")
+        HistoricalClient = apps.get_model("clients", "Client")
+        HistoricalDebt = apps.get_model("debts", "Debt")
+        HistoricalPayment = apps.get_model("payments", "Payment")
+        user = apps.get_model("users", "User").objects.create(username="seller", email="seller@example.com")
+        clients = [
+            HistoricalClient.objects.create(name="Али", phone="998901112233", company=Company.objects.create(name="Магазин")),
+            HistoricalClient.objects.create(name="Вали", phone="998904445566", company=Company.objects.create(name="Склад")),
+            HistoricalClient.objects.create(name="Без компании", phone="998907778899"),
+        ]
+        for client in clients:
+            debt = HistoricalDebt.objects.create(client=client, total_amount=10, remaining_amount=10)
+            HistoricalPayment.objects.create(debt=debt, amount=5, user=user)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+        debts = apps.get_model("debts", "Debt").objects.select_related("client")
+        self.assertEqual(debts.count(), 3)
+        for debt in debts:
+            self.assertEqual(debt.company_id, debt.client.company_id)
+        for payment in apps.get_model("payments", "Payment").objects.select_related("debt__client"):
+            self.assertEqual(payment.company_id, payment.debt.client.company_id)
+
+
+class CompanyFilterTest(TestCase):
+    """Списки фильтруются по company_id самой строки, без join через клиента"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        self.debt = Debt.objects.create(client=client, total_amount=Decimal("100.00"))
+        self.moved = Debt.objects.create(client=client, total_amount=Decimal("50.00"))
+        self.payment = Payment.objects.create(debt=self.debt, amount=Decimal("10.00"), user=self.user)
+        self.moved_payment = Payment.objects.create(debt=self.moved, amount=Decimal("10.00"), user=self.user)
+        # Строки с company_id другой компании при клиенте этой
+        other = Company.objects.create(name="Чужой")
+        Debt.objects.filter(pk=self.moved.pk).update(company=other)
+        Payment.objects.filter(pk=self.moved_payment.pk).update(company=other)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def ids(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = response.data["results"] if isinstance(response.data, dict) else response.data
+        return [row["id"] for row in rows]
+
+    def test_debts_created_with_company(self):
+        self.assertEqual(self.debt.company_id, self.company.id)
+        self.assertEqual(self.payment.company_id, self.company.id)
+
+    def test_lists_filter_on_company_id(self):
+        self.assertEqual(self.ids(reverse("debt-list-create")), [self.debt.id])
+        self.assertEqual(self.ids(reverse("payment-list")), [str(self.payment.id)])
+        self.assertEqual(self.ids(reverse("debt-payments", args=[self.moved.id])), [])
@@ -1,12 +1,17 @@
 from django.urls import path
 from .views import (
     DebtListCreateView,
-    DebtDetailView, DebtDetailPaymentView
+    DebtDetailView, DebtDetailPaymentView, DebtExportView,
+    AsyncDebtListView, AsyncDebtPaymentsView,
 )
 
 urlpatterns = [
     path('', DebtListCreateView.as_view(), name='debt-list-create'),
+    path('export/', DebtExportView.as_view(), name='debt-export'),
     path('<int:pk>/', DebtDetailView.as_view(), name='debt-detail'),
     path('<int:id>/payments/', DebtDetailPaymentView.as_view(), name='debt-payments'
     ),
+    # Async-варианты для ASGI (только чтение)
+    path('async/', AsyncDebtListView.as_view(), name='debt-list-async'),
+    path('<int:id>/payments/async/', AsyncDebtPaymentsView.as_view(), name='debt-payments-async'),
 ]
\ No newline at end of file
@@ -1,8 +1,17 @@
 from rest_framework import generics, permissions
 from debts.models import Debt
-from .serializers import DebtSerializer, PaymentSerializer
+from .serializers import DEBT_COMPACT, DebtSerializer, PaymentSerializer
+from payments.serializers import PAYMENT_COMPACT
+from shared.asyncviews import AsyncReadView
+from shared.compact import CompactListMixin
 from payments.models import Payment
+from django.db import transaction
+from django.db.models import Q
 from django.utils.timezone import now
+from companies.ledger import record_due_date_change
+from shared.cache import cache_company_etag, cache_company_response
+from shared.conditional import ConditionalGetMixin, conditional_get
+from shared.exports import ExportView
 
 from django.utils import timezone
 from rest_framework import permissions
@@ -10,67 +19,145 @@ from rest_framework import generics
 from .models import Debt
 from .serializers import DebtSerializer
 
-class DebtListCreateView(generics.ListCreateAPIView):
+
+def company_debts(company_id, filter_type):
+    """Долги компании для ?filter=all|overdue (другое значение — пустой список)"""
+    if filter_type == 'all':
+        return Debt.objects.filter(company_id=company_id)
+    if filter_type == 'overdue':
+        today = timezone.now().date()
+        return Debt.objects.filter(company_id=company_id, due_date__lt=today, is_paid=False)
+    return Debt.objects.none()
+
+
+class DebtListCreateView(CompactListMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """Просмотр списка задолженностей и добавление нового долга"""
     serializer_class = DebtSerializer
+    compact_rows = DEBT_COMPACT
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    @cache_company_etag
+    def get_etag(self, request):
+        return super().get_etag(request)
+
+    @conditional_get
+    @cache_company_response
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
-        if not hasattr(user, 'company') or user.company is None:
+        if getattr(user, 'company_id', None) is None:
             return Debt.objects.none()
 
-        # Получаем фильтр из параметров запроса
-        filter_type = self.request.query_params.get('filter', 'all')
-
-        # Все долги
-        if filter_type == 'all':
-            return Debt.objects.filter(client__company=user.company)
-        
-        # Просроченные долги
-        elif filter_type == 'overdue':
-            today = timezone.now().date()
-            return Debt.objects.filter(client__company=user.company, due_date__lt=today, is_paid=False)
-
-        return Debt.objects.none()
+        # Фильтр из параметров запроса: все или просроченные
+        return company_debts(user.company_id, self.request.query_params.get('filter', 'all'))
 
     def perform_create(self, serializer):
         """Метод для добавления нового долга"""
         serializer.save()
 
 
-class DebtDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DebtDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Просмотр, обновление и удаление задолженности"""
     serializer_class = DebtSerializer
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
-        if not hasattr(user, 'company') or user.company is None:
+        if getattr(user, 'company_id', None) is None:
             return Debt.objects.none()
-        return Debt.objects.filter(client__company=user.company)
-    
+        return Debt.objects.filter(company_id=user.company_id)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_due_date = serializer.instance.due_date
+        if serializer.validated_data.get('due_date', old_due_date) != old_due_date:
+            # Срок перенесён — sweep_overdue проверит долг заново
+            debt = serializer.save(overdue_at=None)
+        else:
+            debt = serializer.save()
+        record_due_date_change(debt.company_id, debt, old_due_date)
 
-class DebtDetailPaymentView(generics.ListAPIView):
+
+class DebtDetailPaymentView(CompactListMixin, ConditionalGetMixin, generics.ListAPIView):
     """Просмотр платежей по конкретной задолженности"""
     serializer_class = PaymentSerializer
+    compact_rows = PAYMENT_COMPACT
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+    # В ответе debt_total_amount и user_email
+    etag_related = ('debt', 'user')
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_etag_queryset(self):
+        # Платежи несут company_id, так что ETag считается без поиска долга
+        return Payment.objects.filter(debt_id=self.kwargs['id'], company_id=self.request.user.company_id)
 
     def get_queryset(self):
         debt_id = self.kwargs['id']
         user = self.request.user
 
+        if getattr(user, 'company_id', None) is None:
+            return Payment.objects.none()
+
+        # Проверка компании в том же запросе, без подгрузки компаний
         try:
-            debt = Debt.objects.get(id=debt_id)
+            debt = Debt.objects.select_related('client').get(id=debt_id, company_id=user.company_id)
         except Debt.DoesNotExist:
             return Payment.objects.none()
 
-        if not hasattr(user, 'company') or user.company is None:
-            return Payment.objects.none()
+        # debt у платежей уже известен менеджеру, user подтягиваем JOIN-ом для user_email
+        return debt.payments.select_related('user')
+
+
+class DebtExportView(ExportView):
+    """Выгрузка долгов компании в CSV/NDJSON"""
+    model = Debt
+    columns = (
+        ("id", "id"),
+        ("client_id", "client_id"),
+        ("client_name", "client__name"),
+        ("total_amount", "total_amount"),
+        ("remaining_amount", "remaining_amount"),
+        ("due_date", "due_date"),
+        ("is_paid", "is_paid"),
+        ("created_at", "created_at"),
+    )
+    filename = "debts"
+    status_filters = {
+        "paid": lambda: Q(is_paid=True),
+        "unpaid": lambda: Q(is_paid=False),
+        "overdue": lambda: Q(is_paid=False, due_date__lt=timezone.now().date()),
+    }
+
+
+class AsyncDebtListView(AsyncReadView):
+    """Async-вариант списка долгов для ASGI (только чтение)"""
+    serializer_class = DebtSerializer
+    compact_rows = DEBT_COMPACT
 
-        if debt.client.company != user.company:
-            return Payment.objects.none()
+    def get_queryset(self):
+        return company_debts(self.request.user.company_id, self.request.GET.get('filter', 'all'))
 
-        return debt.payments.all()
-    
 
+class AsyncDebtPaymentsView(AsyncReadView):
+    """Async-вариант платежей по долгу"""
+    serializer_class = PaymentSerializer
+    compact_rows = PAYMENT_COMPACT
+    etag_related = ('debt', 'user')
+
+    def get_queryset(self):
+        # Платёж другой компании не найдётся: фильтр по company_id платежа
+        return Payment.objects.filter(
+            debt_id=self.kwargs['id'], company_id=self.request.user.company_id
+        ).select_related('debt', 'user')
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_company_from_debt(apps, schema_editor):
+    Debt = apps.get_model('debts', 'Debt')
+    Payment = apps.get_model('payments', 'Payment')
+    Payment.objects.update(
+        company_id=Subquery(Debt.objects.filter(pk=OuterRef('debt_id')).values('company_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_ledger'),
+        ('debts', '0003_debt_company'),
+        ('payments', '0003_payment_payment_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='payment',
+            name='payment_created_id_idx',
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='companies.company', verbose_name='Company'),
+        ),
+        migrations.RunPython(copy_company_from_debt, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['company', 'created_at', 'id'], name='payment_company_created_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from shared.models import BaseModel
 from debts.models import Debt
-from django.db import models
+from shared.cache import bump_company_version
+from django.db import models, transaction
 
 
 class Payment(BaseModel):
@@ -13,16 +14,44 @@ class Payment(BaseModel):
         related_name="payments",
         verbose_name="User",
     )
+    # Copy of debt.company so company lists skip the debt/client joins
+    company = models.ForeignKey(
+        "companies.Company",
+        on_delete=models.CASCADE,
+        related_name="payments",
+        null=True,
+        blank=True,
+        verbose_name="Company",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'created_at', 'id'], name='payment_company_created_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.debt.remaining_amount >= self.amount:
-            self.debt.remaining_amount -= self.amount
-            self.debt.client.balanse -= self.amount
-        else:
-            raise ValueError("Payment exceeds remaining debt amount.")
-        super().save(*args, **kwargs)
-        self.debt.save()
-        self.debt.client.save()
+        """Posting, changing the amount or moving the payment to another debt
+        updates the debt and client balances in the same transaction"""
+        from payments.services import apply_payment, change_payment
+
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            if self._state.adding:
+                apply_payment(self)
+            elif update_fields is None or {'amount', 'debt'} & set(update_fields):
+                change_payment(self)
+            super().save(*args, **kwargs)
+        bump_company_version(self.company_id)
+
+    def delete(self, *args, **kwargs):
+        """Returns the amount to the debt and client balances"""
+        from payments.services import revert_payment
+
+        with transaction.atomic():
+            revert_payment(self)
+            result = super().delete(*args, **kwargs)
+        bump_company_version(self.company_id)
+        return result
 
     def __str__(self):
         return f"Payment of {self.amount} for {self.debt.client.name}"
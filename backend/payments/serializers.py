@@ -1,15 +1,51 @@
+from decimal import Decimal
+
+from django.db.models import F
 from rest_framework import serializers
+from debts.balances import BalanceError
 from payments.models import Payment
+from payments.services import PaymentExceedsDebtError
+from shared.compact import CompactRows
 
 class PaymentSerializer(serializers.ModelSerializer):
+    # Как в пакетной оплате: отрицательная сумма подняла бы остаток долга
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"))
+
     class Meta:
         model = Payment
         fields = "__all__"
-        read_only_fields = ["user"]  # Делаем поле user доступным только для чтения
+        read_only_fields = ["user", "company"]  # Делаем поле user доступным только для чтения
+
+    def validate_debt(self, debt):
+        """Платёж можно провести или перенести только на долг своей компании"""
+        request = self.context.get("request")
+        company_id = getattr(request.user, "company_id", None) if request else None
+        if company_id is None or debt.company_id != company_id:
+            raise serializers.ValidationError("Долг не найден.")
+        return debt
 
     def create(self, validated_data):
         """Устанавливаем текущего пользователя автоматически"""
         request = self.context.get("request")
-        if request.user.company == validated_data['debt'].client.company:
-            validated_data["user"] = request.user
-        return super().create(validated_data)
+        validated_data["user_id"] = request.user.id
+        try:
+            return super().create(validated_data)
+        except PaymentExceedsDebtError as exc:
+            raise serializers.ValidationError({"amount": str(exc)})
+
+    def update(self, instance, validated_data):
+        """Изменение суммы или долга пересчитывает остатки (см. Payment.save)"""
+        try:
+            return super().update(instance, validated_data)
+        except BalanceError as exc:
+            raise serializers.ValidationError({"amount": str(exc)})
+
+
+class PaymentBulkItemSerializer(serializers.Serializer):
+    """Один элемент пакетной оплаты"""
+    debt = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"))
+
+
+# ?view=compact: колонки списка, от пользователя — только email
+PAYMENT_COMPACT = CompactRows(Payment, ('id', 'debt', 'amount', 'created_at'), user_email=F('user__email'))
@@ -0,0 +1,152 @@
+from django.db import transaction
+from django.utils import timezone
+
+from clients.models import Client
+from companies.ledger import record_payment_change, record_payments
+from shared.cache import bump_company_version
+from debts.balances import BalanceError, change_remaining
+from debts.models import Debt
+from payments.models import Payment
+
+
+class PaymentExceedsDebtError(BalanceError):
+    """Сумма платежа больше остатка долга"""
+
+
+def sync_debt(payment, balance):
+    """Переносит остаток из RETURNING в ``payment.debt``, не перечитывая долг"""
+    debt = payment.debt if Payment.debt.is_cached(payment) and payment.debt.pk == balance.pk else None
+    if debt is None:
+        debt = Debt(pk=balance.pk, client_id=balance.client_id, company_id=balance.company_id,
+                    total_amount=balance.total_amount)
+        payment.debt = debt
+    debt.remaining_amount = balance.remaining_amount
+    debt.is_paid = balance.is_paid
+    debt.due_date = balance.due_date
+    return debt
+
+
+def apply_payment(payment):
+    """Списывает платёж с остатка долга и баланса клиента.
+
+    Проверка остатка и списание — один условный UPDATE (на PostgreSQL вместе
+    с клиентом), поэтому два кассира не могут переплатить один долг.
+    Вызывается в транзакции, в которой вставляется сам платёж (см. ``Payment.save``).
+    """
+    balance = change_remaining(payment.debt_id, -payment.amount)
+    if balance is None:
+        raise PaymentExceedsDebtError("Payment exceeds remaining debt amount.")
+
+    sync_debt(payment, balance)
+    payment.company_id = balance.company_id
+    record_payments(balance.company_id, [payment])
+    return balance
+
+
+def refund(debt_id, amount, day, count):
+    """Возвращает ``amount`` на остаток долга (удаление или уменьшение платежа)"""
+    balance = change_remaining(debt_id, amount)
+    if balance is None:
+        raise BalanceError("Остаток долга превысил бы его сумму: сверьте балансы (reconcile_balances).")
+    was_paid = balance.remaining_amount - amount == 0
+    record_payment_change(balance.company_id, balance, -amount, day, count, was_paid)
+    return balance
+
+
+def charge(debt_id, amount, day, count):
+    """Списывает ``amount`` с остатка долга (перенос или увеличение платежа)"""
+    balance = change_remaining(debt_id, -amount)
+    if balance is None:
+        raise PaymentExceedsDebtError("Payment exceeds remaining debt amount.")
+    was_paid = balance.remaining_amount + amount == 0
+    record_payment_change(balance.company_id, balance, amount, day, count, was_paid)
+    return balance
+
+
+def locked_payment(payment_id):
+    """Сохранённые долг, сумма и дата платежа под блокировкой его строки"""
+    return Payment.objects.select_for_update().filter(pk=payment_id).values('debt_id', 'amount', 'created_at').first()
+
+
+def change_payment(payment):
+    """Переносит изменение суммы или долга сохранённого платежа на остатки"""
+    old = locked_payment(payment.pk)
+    if old is None:
+        return
+    day = timezone.localdate(old['created_at'])
+    if old['debt_id'] != payment.debt_id:
+        refund(old['debt_id'], old['amount'], day, -1)
+        balance = charge(payment.debt_id, payment.amount, day, 1)
+        sync_debt(payment, balance)
+        payment.company_id = balance.company_id
+    elif payment.amount > old['amount']:
+        sync_debt(payment, charge(payment.debt_id, payment.amount - old['amount'], day, 0))
+    elif payment.amount < old['amount']:
+        sync_debt(payment, refund(payment.debt_id, old['amount'] - payment.amount, day, 0))
+
+
+def revert_payment(payment):
+    """Возвращает сумму удаляемого платежа на остаток долга и баланс клиента"""
+    old = locked_payment(payment.pk)
+    if old is None:
+        # Платёж уже удалён параллельным запросом
+        return
+    refund(old['debt_id'], old['amount'], timezone.localdate(old['created_at']), -1)
+
+
+def post_payments_bulk(items, user):
+    """Проводит пачку платежей одной транзакцией.
+
+    ``items`` — список пар ``(debt_id, amount)``. Долги компании пользователя
+    читаются и блокируются одним запросом, клиенты — вторым, изменения пишутся
+    через ``bulk_create``/``bulk_update``. Возвращает список результатов в
+    порядке входных элементов: ``(payment, None)`` или ``(None, ошибка)``.
+    """
+    with transaction.atomic():
+        debt_ids = {debt_id for debt_id, _ in items}
+        debts = {
+            debt.pk: debt
+            for debt in Debt.objects.select_for_update()
+            .filter(pk__in=debt_ids, company_id=user.company_id)
+            .order_by('pk')
+        }
+        clients = {
+            client.pk: client
+            for client in Client.objects.select_for_update()
+            .filter(pk__in={debt.client_id for debt in debts.values()})
+            .order_by('pk')
+        }
+
+        results = []
+        payments = []
+        for debt_id, amount in items:
+            debt = debts.get(debt_id)
+            if debt is None:
+                results.append((None, "Долг не найден."))
+                continue
+            if amount > debt.remaining_amount:
+                results.append((None, "Payment exceeds remaining debt amount."))
+                continue
+
+            debt.remaining_amount -= amount
+            debt.is_paid = debt.remaining_amount == 0
+            clients[debt.client_id].balanse -= amount
+
+            payment = Payment(debt=debt, amount=amount, user_id=user.id, company_id=user.company_id)
+            payments.append(payment)
+            results.append((payment, None))
+
+        if payments:
+            touched_debts = {payment.debt_id: payment.debt for payment in payments}
+            touched_clients = {debt.client_id: clients[debt.client_id] for debt in touched_debts.values()}
+            now = timezone.now()
+            for obj in [*touched_debts.values(), *touched_clients.values()]:
+                obj.updated_at = now
+
+            Payment.objects.bulk_create(payments)
+            Debt.objects.bulk_update(touched_debts.values(), ['remaining_amount', 'is_paid', 'updated_at'])
+            Client.objects.bulk_update(touched_clients.values(), ['balanse', 'updated_at'])
+            record_payments(user.company_id, payments)
+            bump_company_version(user.company_id)
+
+    return results
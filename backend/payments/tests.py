@@ -1,3 +1,267 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from companies.models import Company
+from debts.balances import BalanceError
+from debts.models import Debt
+from payments.models import Payment
+from payments.services import PaymentExceedsDebtError
+from users.models import User
+
+
+def create_debt(total_amount):
+    company = Company.objects.create(name="Магазин")
+    user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=company)
+    client = Client.objects.create(name="Али", phone="998901112233", company=company)
+    debt = Debt.objects.create(client=client, total_amount=total_amount)
+    return user, debt
+
+
+class PaymentPostingTest(TestCase):
+    """Проведение платежа меняет остаток долга и баланс клиента"""
+
+    def setUp(self):
+        self.user, self.debt = create_debt(Decimal("100.00"))
+
+    def test_payment_updates_balances(self):
+        Payment.objects.create(debt=self.debt, amount=Decimal("100.00"), user=self.user)
+
+        self.debt.refresh_from_db()
+        self.debt.client.refresh_from_db()
+        self.assertEqual(self.debt.remaining_amount, Decimal("0.00"))
+        self.assertTrue(self.debt.is_paid)
+        self.assertEqual(self.debt.client.balanse, Decimal("0.00"))
+
+    def test_overpayment_is_rejected(self):
+        with self.assertRaises(PaymentExceedsDebtError):
+            Payment.objects.create(debt=self.debt, amount=Decimal("100.01"), user=self.user)
+
+        self.debt.refresh_from_db()
+        self.assertEqual(self.debt.remaining_amount, Decimal("100.00"))
+        self.assertFalse(Payment.objects.exists())
+
+
+class PaymentBulkCreateTest(TestCase):
+    """Пакетные оплаты проводятся частично и возвращают результат по каждому элементу"""
+
+    def setUp(self):
+        self.user, self.debt = create_debt(Decimal("100.00"))
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_bulk_reports_per_item_results(self):
+        items = [
+            {"debt": self.debt.id, "amount": "30.00"},
+            {"debt": self.debt.id, "amount": "80.00"},
+            {"debt": 999999, "amount": "10.00"},
+            {"debt": self.debt.id, "amount": "-5"},
+            {"debt": self.debt.id, "amount": "70.00"},
+        ]
+        with self.assertNumQueries(10):
+            response = self.api.post(reverse("payment-bulk-create"), items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r["success"] for r in response.data["results"]], [True, False, False, False, True])
+        self.debt.refresh_from_db()
+        self.debt.client.refresh_from_db()
+        self.assertEqual(self.debt.remaining_amount, Decimal("0.00"))
+        self.assertTrue(self.debt.is_paid)
+        self.assertEqual(self.debt.client.balanse, Decimal("0.00"))
+        self.assertEqual(Payment.objects.count(), 2)
+
+
+class PaymentChangeTest(TestCase):
+    """Изменение и удаление платежей и долгов пересчитывают остатки, сводка и сверка сходятся"""
+
+    def setUp(self):
+        self.user, self.debt = create_debt(Decimal("100.00"))
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def assert_balances(self, remaining, balanse):
+        self.debt.refresh_from_db()
+        self.assertEqual(self.debt.remaining_amount, Decimal(remaining))
+        self.assertEqual(self.debt.is_paid, self.debt.remaining_amount == 0)
+        self.assertEqual(Client.objects.get(pk=self.debt.client_id).balanse, Decimal(balanse))
+        call_command("reconcile_balances", stdout=StringIO())
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+    def test_delete_restores_balances(self):
+        payment = Payment.objects.create(debt=self.debt, amount=Decimal("100.00"), user=self.user)
+        self.assert_balances("0.00", "0.00")
+
+        response = self.api.delete(reverse("payment-detail", kwargs={"pk": payment.pk}))
+        self.assertEqual(response.status_code, 204)
+        self.assert_balances("100.00", "100.00")
+
+    def test_update_amount(self):
+        payment = Payment.objects.create(debt=self.debt, amount=Decimal("30.00"), user=self.user)
+        url = reverse("payment-detail", kwargs={"pk": payment.pk})
+
+        self.assertEqual(self.api.patch(url, {"amount": "100.00"}, format="json").status_code, 200)
+        self.assert_balances("0.00", "0.00")
+        self.assertEqual(self.api.patch(url, {"amount": "100.01"}, format="json").status_code, 400)
+        self.assertEqual(self.api.patch(url, {"amount": "10.00"}, format="json").status_code, 200)
+        self.assert_balances("90.00", "90.00")
+
+    def test_move_to_another_debt(self):
+        payment = Payment.objects.create(debt=self.debt, amount=Decimal("30.00"), user=self.user)
+        other = Debt.objects.create(client=self.debt.client, total_amount=Decimal("50.00"))
+        url = reverse("payment-detail", kwargs={"pk": payment.pk})
+
+        self.assertEqual(self.api.patch(url, {"debt": other.pk}, format="json").status_code, 200)
+        other.refresh_from_db()
+        self.assertEqual(other.remaining_amount, Decimal("20.00"))
+        self.assert_balances("100.00", "120.00")
+
+    def test_foreign_debt_is_rejected(self):
+        company = Company.objects.create(name="Чужой магазин")
+        client = Client.objects.create(name="Вали", phone="998907778899", company=company)
+        foreign = Debt.objects.create(client=client, total_amount=Decimal("50.00"))
+        payment = Payment.objects.create(debt=self.debt, amount=Decimal("30.00"), user=self.user)
+
+        response = self.api.patch(
+            reverse("payment-detail", kwargs={"pk": payment.pk}), {"debt": foreign.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.api.post(reverse("payment-list"), {"debt": foreign.pk, "amount": "10.00"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.remaining_amount, Decimal("50.00"))
+        self.assertEqual(Payment.objects.get(pk=payment.pk).company_id, self.debt.company_id)
+        self.assert_balances("70.00", "70.00")
+
+    def test_debt_total_change_and_delete(self):
+        Payment.objects.create(debt=self.debt, amount=Decimal("40.00"), user=self.user)
+        url = reverse("debt-detail", kwargs={"pk": self.debt.pk})
+
+        self.assertEqual(self.api.patch(url, {"total_amount": "150.00"}, format="json").status_code, 200)
+        self.assert_balances("110.00", "110.00")
+        self.assertEqual(self.api.patch(url, {"total_amount": "30.00"}, format="json").status_code, 400)
+        self.assertEqual(self.api.patch(url, {"total_amount": "40.00"}, format="json").status_code, 200)
+        self.assert_balances("0.00", "0.00")
+
+        Debt.objects.create(client=self.debt.client, total_amount=Decimal("25.00"))
+        self.assertEqual(self.api.delete(url).status_code, 204)
+        self.assertEqual(Client.objects.get(pk=self.debt.client_id).balanse, Decimal("25.00"))
+        call_command("reconcile_balances", stdout=StringIO())
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
+
+    def test_amount_must_be_positive(self):
+        payment = Payment.objects.create(debt=self.debt, amount=Decimal("50.00"), user=self.user)
+        for amount in ("-10.00", "0.00"):
+            response = self.api.post(reverse("payment-list"), {"debt": self.debt.pk, "amount": amount}, format="json")
+            self.assertEqual(response.status_code, 400, amount)
+            self.assertIn("amount", response.data)
+            response = self.api.patch(reverse("payment-detail", kwargs={"pk": payment.pk}), {"amount": amount}, format="json")
+            self.assertEqual(response.status_code, 400, amount)
+        self.assert_balances("50.00", "50.00")
+
+    def test_move_debt_to_another_client(self):
+        Payment.objects.create(debt=self.debt, amount=Decimal("40.00"), user=self.user)
+        old_client = self.debt.client
+        other = Client.objects.create(name="Вали", phone="998904445566", company=old_client.company)
+        url = reverse("debt-detail", kwargs={"pk": self.debt.pk})
+
+        response = self.api.put(
+            url, {"client": other.pk, "total_amount": "100.00", "due_date": self.debt.due_date.isoformat()}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_balances("60.00", "60.00")
+        self.assertEqual(Client.objects.get(pk=old_client.pk).balanse, Decimal("0.00"))
+
+        # Смена клиента и суммы в одном запросе
+        response = self.api.patch(url, {"client": old_client.pk, "total_amount": "150.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assert_balances("110.00", "110.00")
+        self.assertEqual(Client.objects.get(pk=other.pk).balanse, Decimal("0.00"))
+
+    def test_move_debt_to_foreign_client(self):
+        foreign = Client.objects.create(name="Чужой", phone="998907778899", company=Company.objects.create(name="Чужой"))
+        self.debt.client = foreign
+        with self.assertRaises(BalanceError):
+            self.debt.save()
+        self.assert_balances("100.00", "100.00")
+        self.assertEqual(Client.objects.get(pk=foreign.pk).balanse, Decimal("0.00"))
+
+    def test_check_reports_drift(self):
+        Client.objects.filter(pk=self.debt.client_id).update(balanse=Decimal("99.00"))
+        Debt.objects.filter(pk=self.debt.pk).update(remaining_amount=Decimal("0.00"))
+        output = StringIO()
+        with self.assertRaisesMessage(CommandError, "долгов 1, клиентов 1"):
+            call_command("reconcile_balances", stdout=output)
+        self.assertIn("ожидалось 100", output.getvalue())
+
+    def test_repair_fixes_drift(self):
+        Payment.objects.create(debt=self.debt, amount=Decimal("40.00"), user=self.user)
+        Client.objects.filter(pk=self.debt.client_id).update(balanse=Decimal("99.00"))
+        Debt.objects.filter(pk=self.debt.pk).update(remaining_amount=Decimal("0.00"), is_paid=True)
+
+        output = StringIO()
+        call_command("reconcile_balances", "--repair", "--batch-size", "1", stdout=output)
+        self.assertIn("исправлено: долгов 1, клиентов 1", output.getvalue())
+        self.assert_balances("60.00", "60.00")
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentPaymentTest(TransactionTestCase):
+    """Параллельные платежи по одному долгу не переплачивают его"""
+
+    workers = 16
+    attempts = 60
+
+    def test_parallel_payments_keep_balances_consistent(self):
+        user, debt = create_debt(Decimal("1000.00"))
+
+        def pay(_):
+            try:
+                Payment.objects.create(debt_id=debt.id, amount=Decimal("25.00"), user=user)
+                return True
+            except PaymentExceedsDebtError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(pay, range(self.attempts)))
+
+        debt.refresh_from_db()
+        client = Client.objects.get(pk=debt.client_id)
+        self.assertEqual(sum(results), 40)
+        self.assertEqual(Payment.objects.filter(debt=debt).count(), 40)
+        self.assertEqual(debt.remaining_amount, Decimal("0.00"))
+        self.assertTrue(debt.is_paid)
+        self.assertEqual(client.balanse, Decimal("0.00"))
+
+    def test_parallel_create_and_delete(self):
+        user, debt = create_debt(Decimal("1000.00"))
+        existing = [Payment.objects.create(debt=debt, amount=Decimal("25.00"), user=user) for _ in range(20)]
+
+        def run(job):
+            try:
+                if isinstance(job, Payment):
+                    job.delete()
+                else:
+                    Payment.objects.create(debt_id=debt.id, amount=Decimal("25.00"), user=user)
+            except PaymentExceedsDebtError:
+                pass
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(run, [*existing, *range(self.attempts)]))
+
+        debt.refresh_from_db()
+        paid = Payment.objects.filter(debt=debt).count() * Decimal("25.00")
+        self.assertEqual(debt.remaining_amount, Decimal("1000.00") - paid)
+        call_command("reconcile_balances", stdout=StringIO())
+        call_command("rebuild_ledger", "--check", stdout=StringIO())
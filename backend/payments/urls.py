@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import PaymentListCreateView, PaymentDetailView
+from .views import (
+    PaymentListCreateView, PaymentDetailView, PaymentBulkCreateView, PaymentExportView, AsyncPaymentListView,
+)
 
 
 urlpatterns = [
     path("", PaymentListCreateView.as_view(), name="payment-list"),
-    path("<int:pk>/", PaymentDetailView.as_view(), name="payment-detail"),
+    path("bulk/", PaymentBulkCreateView.as_view(), name="payment-bulk-create"),
+    path("export/", PaymentExportView.as_view(), name="payment-export"),
+    path("<uuid:pk>/", PaymentDetailView.as_view(), name="payment-detail"),
+    # Async-вариант для ASGI (только чтение)
+    path("async/", AsyncPaymentListView.as_view(), name="payment-list-async"),
 ]
@@ -1,37 +1,126 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 from django.shortcuts import render
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from payments.models import Payment
-from payments.serializers import PaymentSerializer
+from payments.serializers import PAYMENT_COMPACT, PaymentSerializer, PaymentBulkItemSerializer
+from payments.services import post_payments_bulk
+from shared.asyncviews import AsyncReadView
+from shared.compact import CompactListMixin
+from shared.conditional import ConditionalGetMixin, conditional_get
+from shared.exports import ExportView
 
 
 
-class PaymentListCreateView(generics.ListCreateAPIView):
+class PaymentListCreateView(CompactListMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """Просмотр списка оплат и добавление новой оплаты"""
     serializer_class = PaymentSerializer
+    compact_rows = PAYMENT_COMPACT
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
-        if not hasattr(user, 'company') or user.company is None:
+        if getattr(user, 'company_id', None) is None:
             return Payment.objects.none()
-        return Payment.objects.filter(debt__client__company=user.company)
+        return Payment.objects.filter(company_id=user.company_id)
 
     def perform_create(self, serializer):
         """Автоматически добавляет текущего пользователя"""
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
 
     
 
-class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PaymentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Просмотр, обновление и удаление оплаты"""
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
-        if not hasattr(user, 'company') or user.company is None:
+        if getattr(user, 'company_id', None) is None:
             return Payment.objects.none()
-        return Payment.objects.filter(debt__client__company=user.company)
+        return Payment.objects.filter(company_id=user.company_id)
+
+
+
+class PaymentBulkCreateView(APIView):
+    """Пакетное добавление оплат: список {debt, amount} за один запрос"""
+    permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Ожидается непустой список платежей."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.PAYMENTS_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"Не больше {settings.PAYMENTS_BULK_MAX_ITEMS} платежей за запрос."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if request.user.company_id is None:
+            return Response({"detail": "У пользователя нет связанной компании."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Сначала проверяем формат всех элементов, в базу идут только валидные
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = PaymentBulkItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {"index": index, "success": False, "errors": serializer.errors}
 
+        posted = post_payments_bulk([(data["debt"], data["amount"]) for _, data in valid], request.user)
+        for (index, _), (payment, error) in zip(valid, posted):
+            if payment is None:
+                results[index] = {"index": index, "success": False, "errors": {"non_field_errors": [error]}}
+            else:
+                results[index] = {"index": index, "success": True, "payment": PaymentSerializer(payment).data}
 
-# Create your views here.
+        created = sum(1 for result in results if result["success"])
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=status.HTTP_201_CREATED if created == len(results) else status.HTTP_207_MULTI_STATUS,
+        )
+
+
+
+class PaymentExportView(ExportView):
+    """Выгрузка оплат компании в CSV/NDJSON (status фильтрует по долгу)"""
+    model = Payment
+    columns = (
+        ("id", "id"),
+        ("debt_id", "debt_id"),
+        ("client_name", "debt__client__name"),
+        ("amount", "amount"),
+        ("user_email", "user__email"),
+        ("created_at", "created_at"),
+    )
+    filename = "payments"
+    status_filters = {
+        "paid": lambda: Q(debt__is_paid=True),
+        "unpaid": lambda: Q(debt__is_paid=False),
+        "overdue": lambda: Q(debt__is_paid=False, debt__due_date__lt=timezone.now().date()),
+    }
+
+
+class AsyncPaymentListView(AsyncReadView):
+    """Async-вариант списка оплат для ASGI (только чтение)"""
+    serializer_class = PaymentSerializer
+    compact_rows = PAYMENT_COMPACT
+
+    def get_queryset(self):
+        return Payment.objects.filter(company_id=self.request.user.company_id)
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Reminder
+
+
+@admin.register(Reminder)
+class ReminderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'debt', 'company', 'due_date', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'due_date')
+    ordering = ('-created_at',)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reminders.queue import deliver_batch
+from reminders.sinks import get_sink
+
+
+class Command(BaseCommand):
+    help = "Разбирает очередь напоминаний; несколько воркеров можно запускать параллельно"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.REMINDER_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно, а не до опустошения очереди")
+        parser.add_argument('--interval', type=float, default=5.0, help="Пауза в секундах, когда очередь пуста")
+
+    def handle(self, *args, batch_size, loop, interval, **options):
+        sink = get_sink()
+        total_sent = total_failed = total_cancelled = 0
+        try:
+            while True:
+                sent, failed, cancelled = deliver_batch(sink, batch_size, settings.REMINDER_MAX_ATTEMPTS)
+                total_sent += sent
+                total_failed += failed
+                total_cancelled += cancelled
+                if sent or failed or cancelled:
+                    continue
+                if not loop:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.close()
+        self.stdout.write(f"Отправлено: {total_sent}, ошибок: {total_failed}, отменено: {total_cancelled}")
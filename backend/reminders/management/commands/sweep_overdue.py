@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reminders.queue import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = "Отмечает новые просроченные долги и ставит напоминания в очередь (запускать по расписанию)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.REMINDER_BATCH_SIZE)
+
+    def handle(self, *args, batch_size, **options):
+        marked = sweep_overdue(batch_size)
+        self.stdout.write(f"Просроченных долгов отмечено: {marked}")
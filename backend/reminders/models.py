@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+from shared.models import BaseModel
+
+
+class Reminder(BaseModel):
+    """Задание на напоминание о просроченном долге (очередь в базе).
+
+    Воркеры забирают задания через ``SELECT ... FOR UPDATE SKIP LOCKED``,
+    поэтому несколько процессов разбирают очередь параллельно без дублей.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    # Долг оплачен или срок перенесён до отправки
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка'),
+        (CANCELLED, 'Отменено'),
+    )
+
+    debt = models.ForeignKey('debts.Debt', on_delete=models.CASCADE, related_name='reminders')
+    company = models.ForeignKey('companies.Company', on_delete=models.CASCADE, related_name='reminders')
+    # Срок долга на момент постановки: после переноса срока будет новое напоминание
+    due_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['debt', 'due_date'], name='unique_reminder_per_debt_due_date'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                condition=models.Q(status='pending'),
+                name='reminder_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.debt_id} ({self.due_date}): {self.status}"
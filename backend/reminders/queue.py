@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from debts.models import Debt
+from reminders.models import Reminder
+from shared.cache import bump_company_version
+
+
+def sweep_overdue(batch_size, today=None):
+    """Отмечает новые просроченные долги и ставит по ним напоминания.
+
+    Долги берутся пачками по частичному индексу ``debt_overdue_sweep_idx``
+    (неоплаченные и ещё не отмеченные), каждая пачка — своя транзакция;
+    строки, занятые другим процессом, пропускаются. Долги без компании
+    пропускаются: напоминанию нужна компания (``Reminder.company``).
+    Возвращает число отмеченных долгов.
+    """
+    today = today or timezone.localdate()
+    marked = 0
+    while True:
+        with transaction.atomic():
+            debts = list(
+                Debt.objects.select_for_update(skip_locked=True)
+                .filter(is_paid=False, overdue_at__isnull=True, due_date__lt=today, company_id__isnull=False)
+                .order_by('due_date', 'id')
+                .only('id', 'company_id', 'due_date')[:batch_size]
+            )
+            if not debts:
+                return marked
+
+            now = timezone.now()
+            Debt.objects.filter(pk__in=[debt.pk for debt in debts]).update(overdue_at=now, updated_at=now)
+            Reminder.objects.bulk_create(
+                [Reminder(debt_id=debt.pk, company_id=debt.company_id, due_date=debt.due_date) for debt in debts],
+                ignore_conflicts=True,
+            )
+            for company_id in {debt.company_id for debt in debts}:
+                bump_company_version(company_id)
+        marked += len(debts)
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед повтором: 1, 2, 4 ... минут, не больше часа"""
+    return timedelta(minutes=min(2 ** (attempts - 1), 60))
+
+
+def deliver_batch(sink, batch_size, max_attempts):
+    """Забирает пачку заданий (SKIP LOCKED) и отправляет их через ``sink``.
+
+    Блокировки держатся до конца транзакции, пока пачка отправляется, так что
+    параллельные воркеры берут другие задания. Задания по долгам, которые
+    уже оплачены или перенесены на другой срок, отменяются без отправки.
+    Возвращает (отправлено, ошибок, отменено).
+    """
+    sent = failed = cancelled = 0
+    with transaction.atomic():
+        reminders = list(
+            Reminder.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(status=Reminder.PENDING, available_at__lte=timezone.now())
+            .select_related('debt__client')
+            .order_by('available_at')[:batch_size]
+        )
+        for reminder in reminders:
+            if reminder.debt.is_paid or reminder.debt.due_date != reminder.due_date:
+                reminder.status = Reminder.CANCELLED
+                reminder.updated_at = timezone.now()
+                cancelled += 1
+                continue
+            reminder.attempts += 1
+            try:
+                sink.send(reminder)
+            except Exception as exc:
+                reminder.last_error = f"{type(exc).__name__}: {exc}"
+                if reminder.attempts >= max_attempts:
+                    reminder.status = Reminder.FAILED
+                else:
+                    reminder.available_at = timezone.now() + retry_delay(reminder.attempts)
+                failed += 1
+            else:
+                reminder.status = Reminder.SENT
+                reminder.sent_at = timezone.now()
+                reminder.last_error = ''
+                sent += 1
+            reminder.updated_at = timezone.now()
+
+        Reminder.objects.bulk_update(
+            reminders, ['status', 'attempts', 'available_at', 'sent_at', 'last_error', 'updated_at']
+        )
+    return sent, failed, cancelled
@@ -0,0 +1,60 @@
+import json
+import sys
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def reminder_payload(reminder):
+    debt = reminder.debt
+    return {
+        "reminder": str(reminder.id),
+        "company": str(reminder.company_id),
+        "debt": debt.id,
+        "client": debt.client.name,
+        "phone": debt.client.phone,
+        "remaining_amount": str(debt.remaining_amount),
+        "due_date": reminder.due_date.isoformat(),
+    }
+
+
+class BaseSink:
+    """Доставка напоминаний. ``send`` бросает исключение, если отправка не удалась"""
+
+    def send(self, reminder):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ConsoleSink(BaseSink):
+    """Печатает напоминания в stdout — для разработки"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, reminder):
+        payload = reminder_payload(reminder)
+        self.stream.write(
+            f"Напоминание: {payload['client']} ({payload['phone']}), долг #{payload['debt']} "
+            f"{payload['remaining_amount']} просрочен с {payload['due_date']}\n"
+        )
+
+
+class FileSink(BaseSink):
+    """Дописывает напоминания в файл, по JSON на строку"""
+
+    def __init__(self, path=None):
+        self.file = open(path or settings.REMINDER_FILE_PATH, 'a', encoding='utf-8')
+
+    def send(self, reminder):
+        self.file.write(json.dumps(reminder_payload(reminder), ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def get_sink():
+    return import_string(settings.REMINDER_SINK)()
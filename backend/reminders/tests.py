@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from clients.models import Client
+from companies.models import Company
+from debts.models import Debt
+from payments.models import Payment
+from reminders.models import Reminder
+from reminders.queue import deliver_batch, sweep_overdue
+from reminders.sinks import BaseSink, ConsoleSink, FileSink
+from users.models import User
+
+
+def create_overdue_debts(count, days_overdue=1):
+    company = Company.objects.create(name=f"Магазин {Company.objects.count()}")
+    client = Client.objects.create(name="Али", phone="998901112233", company=company)
+    debts = [Debt.objects.create(client=client, total_amount=Decimal("100.00")) for _ in range(count)]
+    Debt.objects.filter(pk__in=[debt.pk for debt in debts]).update(
+        due_date=timezone.localdate() - timedelta(days=days_overdue)
+    )
+    return debts
+
+
+class FailingSink(BaseSink):
+    def send(self, reminder):
+        raise ConnectionError("SMS-шлюз недоступен")
+
+
+class OverdueSweepTest(TestCase):
+    """Просроченные долги отмечаются пачками, напоминание ставится один раз"""
+
+    def test_sweep_marks_and_queues_once(self):
+        debts = create_overdue_debts(5)
+        Debt.objects.create(client=debts[0].client, total_amount=Decimal("50.00"))
+
+        self.assertEqual(sweep_overdue(batch_size=2), 5)
+        self.assertEqual(Debt.objects.filter(overdue_at__isnull=False).count(), 5)
+        self.assertEqual(Reminder.objects.filter(status=Reminder.PENDING).count(), 5)
+
+        self.assertEqual(sweep_overdue(batch_size=2), 0)
+        self.assertEqual(Reminder.objects.count(), 5)
+
+    def test_debt_without_company_is_skipped(self):
+        client = Client.objects.create(name="Без компании", phone="998900000000")
+        orphan = Debt.objects.create(client=client, total_amount=Decimal("10.00"))
+        Debt.objects.filter(pk=orphan.pk).update(due_date=timezone.localdate() - timedelta(days=1))
+        create_overdue_debts(2)
+
+        self.assertEqual(sweep_overdue(batch_size=1), 2)
+        self.assertEqual(Reminder.objects.count(), 2)
+        self.assertFalse(Reminder.objects.filter(debt=orphan).exists())
+        self.assertEqual(sweep_overdue(batch_size=1), 0)
+
+    def test_delivery_to_file(self):
+        create_overdue_debts(3)
+        sweep_overdue(batch_size=100)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "reminders.jsonl")
+            sink = FileSink(path)
+            self.assertEqual(deliver_batch(sink, batch_size=2, max_attempts=3), (2, 0, 0))
+            self.assertEqual(deliver_batch(sink, batch_size=2, max_attempts=3), (1, 0, 0))
+            self.assertEqual(deliver_batch(sink, batch_size=2, max_attempts=3), (0, 0, 0))
+            sink.close()
+            with open(path, encoding="utf-8") as file:
+                lines = [json.loads(line) for line in file]
+
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]["remaining_amount"], "100.00")
+        self.assertEqual(Reminder.objects.filter(status=Reminder.SENT).count(), 3)
+
+    def test_failed_delivery_is_retried_later(self):
+        create_overdue_debts(1)
+        sweep_overdue(batch_size=100)
+
+        self.assertEqual(deliver_batch(FailingSink(), batch_size=10, max_attempts=2), (0, 1, 0))
+        reminder = Reminder.objects.get()
+        self.assertEqual(reminder.status, Reminder.PENDING)
+        self.assertGreater(reminder.available_at, timezone.now())
+        self.assertIn("SMS-шлюз", reminder.last_error)
+
+        # Пока пауза не истекла, задание не берётся
+        stream = io.StringIO()
+        self.assertEqual(deliver_batch(ConsoleSink(stream), batch_size=10, max_attempts=2), (0, 0, 0))
+
+        Reminder.objects.update(available_at=timezone.now())
+        self.assertEqual(deliver_batch(FailingSink(), batch_size=10, max_attempts=2), (0, 1, 0))
+        self.assertEqual(Reminder.objects.get().status, Reminder.FAILED)
+
+
+    def test_paid_or_rescheduled_debt_is_not_reminded(self):
+        paid, moved, overdue = create_overdue_debts(3)
+        sweep_overdue(batch_size=100)
+        user = User.objects.create_user(username="seller", password="pass", company=paid.company)
+        Payment.objects.create(debt=paid, amount=Decimal("100.00"), user=user)
+        Debt.objects.filter(pk=moved.pk).update(due_date=timezone.localdate() + timedelta(days=7))
+
+        stream = io.StringIO()
+        self.assertEqual(deliver_batch(ConsoleSink(stream), batch_size=10, max_attempts=2), (1, 0, 2))
+        self.assertEqual(Reminder.objects.get(status=Reminder.SENT).debt_id, overdue.pk)
+        self.assertEqual(Reminder.objects.filter(status=Reminder.CANCELLED).count(), 2)
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class ParallelWorkersTest(TransactionTestCase):
+    """Воркеры разбирают очередь через SKIP LOCKED: каждое задание отправляется один раз"""
+
+    workers = 4
+
+    def test_each_reminder_sent_once(self):
+        create_overdue_debts(40)
+        sweep_overdue(batch_size=100)
+
+        class RecordingSink(BaseSink):
+            def __init__(self):
+                self.sent = []
+
+            def send(self, reminder):
+                self.sent.append(reminder.pk)
+
+        def work(_):
+            sink = RecordingSink()
+            try:
+                while deliver_batch(sink, batch_size=3, max_attempts=3) != (0, 0, 0):
+                    pass
+                return sink.sent
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            sent = [pk for batch in executor.map(work, range(self.workers)) for pk in batch]
+
+        self.assertEqual(len(sent), 40)
+        self.assertEqual(len(set(sent)), 40)
+        self.assertFalse(Reminder.objects.exclude(status=Reminder.SENT).exists())
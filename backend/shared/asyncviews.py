@@ -0,0 +1,82 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+
+from shared.conditional import etag_aggregates, etag_matches, make_etag
+from users.authentication import ClaimsJWTAuthentication
+
+
+def render_json(data, status_code=status.HTTP_200_OK):
+    """Рендерит данные JSON-рендерером из REST_FRAMEWORK (orjson по умолчанию)"""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type)
+
+
+async def aqueryset_etag(queryset, *parts, related=()):
+    """Асинхронный вариант shared.conditional.queryset_etag"""
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+    stats = await queryset.aaggregate(**etag_aggregates(related))
+    return make_etag(*stats.values(), *parts)
+
+
+class AsyncReadView(View):
+    """Read-only async view для ASGI: JWT по claims, async ORM, ETag, orjson.
+
+    Аналог generic list views без DRF-диспетчеризации: данные читаются
+    через async ORM, поэтому медленные клиенты не держат воркер. Полное
+    представление строится ``serializer_class`` из уже загруженных объектов
+    (без запросов к базе), ``?view=compact`` — через ``compact_rows``.
+    Пагинации нет — как и у синхронных списков без ``cursor``/``page_size``.
+    """
+    http_method_names = ['get', 'head', 'options']
+    token_claims_user = True
+    serializer_class = None
+    compact_rows = None
+    etag_related = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await ClaimsJWTAuthentication().aauthenticate(request, self)
+        except APIException as exc:
+            # Как rest_framework.views.exception_handler: dict/list — как есть
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+            return render_json(detail, exc.status_code)
+        if result is None:
+            return render_json(
+                {"detail": "Authentication credentials were not provided."}, status.HTTP_401_UNAUTHORIZED
+            )
+        request.user = result[0]
+        if getattr(request.user, 'company_id', None) is None:
+            return render_json({"detail": "У пользователя нет связанной компании."}, status.HTTP_403_FORBIDDEN)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def is_compact(self):
+        return self.request.GET.get('view') == 'compact'
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def get_etag(self, queryset):
+        return await aqueryset_etag(
+            queryset, type(self).__name__, sorted(self.kwargs.items()), sorted(self.request.GET.lists()),
+            related=self.etag_related,
+        )
+
+    async def serialize(self, queryset):
+        if self.is_compact():
+            return [self.compact_rows.row(row) async for row in self.compact_rows.values(queryset)]
+        objects = [obj async for obj in queryset]
+        return self.serializer_class(objects, many=True).data
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        etag = await self.get_etag(queryset)
+        if etag_matches(etag, request):
+            response = HttpResponseNotModified()
+        else:
+            response = render_json(await self.serialize(queryset))
+        response['ETag'] = etag
+        return response
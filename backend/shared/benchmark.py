@@ -0,0 +1,227 @@
+"""Нагрузочный прогон API: фабрики данных и замеры по реальным URL.
+
+Используется командой ``bench_api``. Запросы идут через ``django.test.Client``
+— полный стек middleware, URL-роутинг ``core.urls``, аутентификация и
+рендеринг, — последовательно или параллельными потоками/процессами.
+"""
+import io
+import multiprocessing
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import Client as HttpClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from clients.models import Client
+from companies.models import Company
+from debts.models import Debt
+from payments.models import Payment
+from users.models import User
+from users.tokens import CompanyRefreshToken
+
+DEBT_AMOUNT = Decimal("1000.00")
+PAYMENT_AMOUNT = Decimal("10.00")
+
+
+@dataclass
+class Fixture:
+    """Засеянная компания: то, что нужно сценариям для построения URL"""
+    company_id: uuid.UUID
+    token: str
+    client_ids: list
+    debt_ids: list
+    client_names: list = field(default_factory=list)
+
+
+def make_company(name=None):
+    return Company.objects.create(name=name or f"bench-{uuid.uuid4().hex[:12]}")
+
+
+def make_user(company):
+    return User.objects.create_user(
+        username=f"bench-{company.pk.hex[:12]}",
+        email=f"bench-{company.pk.hex[:12]}@example.com",
+        password=uuid.uuid4().hex,
+        company=company,
+    )
+
+
+def make_clients(company, count, batch_size=2000):
+    clients = [
+        Client(name=f"Клиент {i:06d}", phone=f"99890{i:07d}", company=company)
+        for i in range(count)
+    ]
+    return Client.objects.bulk_create(clients, batch_size=batch_size)
+
+
+def make_debts(company, clients, count, batch_size=2000):
+    today = timezone.localdate()
+    debts = [
+        Debt(
+            client=clients[i % len(clients)],
+            company=company,
+            total_amount=DEBT_AMOUNT,
+            remaining_amount=DEBT_AMOUNT,
+            # Часть долгов просрочена, чтобы ?filter=overdue был не пустым
+            due_date=today + timedelta(days=i % 90 - 30),
+        )
+        for i in range(count)
+    ]
+    return Debt.objects.bulk_create(debts, batch_size=batch_size)
+
+
+def make_payments(company, user, debts, count, batch_size=2000):
+    """Платежи по кругу по долгам; остатки долгов и балансы клиентов сводятся"""
+    payments = []
+    for i in range(count):
+        debt = debts[i % len(debts)]
+        if debt.remaining_amount < PAYMENT_AMOUNT:
+            continue
+        debt.remaining_amount -= PAYMENT_AMOUNT
+        debt.is_paid = debt.remaining_amount == 0
+        payments.append(Payment(debt=debt, amount=PAYMENT_AMOUNT, user=user, company=company))
+
+    Payment.objects.bulk_create(payments, batch_size=batch_size)
+    Debt.objects.bulk_update(debts, ['remaining_amount', 'is_paid'], batch_size=batch_size)
+    return payments
+
+
+def seed_company(clients, debts, payments):
+    """Компания с продавцом, клиентами, долгами и платежами; сводка пересчитана"""
+    with transaction.atomic():
+        company = make_company()
+        user = make_user(company)
+        client_objs = make_clients(company, clients)
+        debt_objs = make_debts(company, client_objs, debts) if client_objs else []
+        if debt_objs and payments:
+            make_payments(company, user, debt_objs, payments)
+
+        balances = {}
+        for debt in debt_objs:
+            balances[debt.client_id] = balances.get(debt.client_id, 0) + debt.remaining_amount
+        for client in client_objs:
+            client.balanse = balances.get(client.pk, 0)
+        Client.objects.bulk_update(client_objs, ['balanse'], batch_size=2000)
+
+    call_command('rebuild_ledger', company=str(company.pk), stdout=io.StringIO())
+    return Fixture(
+        company_id=company.pk,
+        token=str(CompanyRefreshToken.for_user(user).access_token),
+        client_ids=[client.pk for client in client_objs],
+        debt_ids=[debt.pk for debt in debt_objs],
+        client_names=[client.name for client in client_objs],
+    )
+
+
+def drop_company(company_id):
+    Company.objects.filter(pk=company_id).delete()
+
+
+# Сценарии: имя -> (метод, функция построения пути и тела по fixture и rng)
+SCENARIOS = {
+    "clients": ("get", lambda f, rng: ("/api/clients/", None)),
+    "clients-compact-page": ("get", lambda f, rng: ("/api/clients/?view=compact&page_size=50", None)),
+    "clients-search": ("get", lambda f, rng: (f"/api/clients/?search={rng.choice(f.client_names)[-4:]}", None)),
+    "client-debts": ("get", lambda f, rng: (f"/api/clients/{rng.choice(f.client_ids)}/debts/", None)),
+    "debts": ("get", lambda f, rng: ("/api/debts/", None)),
+    "debts-page": ("get", lambda f, rng: ("/api/debts/?page_size=50", None)),
+    "debts-overdue": ("get", lambda f, rng: ("/api/debts/?filter=overdue", None)),
+    "debt-payments": ("get", lambda f, rng: (f"/api/debts/{rng.choice(f.debt_ids)}/payments/", None)),
+    "payments-page": ("get", lambda f, rng: ("/api/payments/?page_size=50", None)),
+    "company-summary": ("get", lambda f, rng: ("/api/companies/summary/", None)),
+    "payment-create": ("post", lambda f, rng: ("/api/payments/", {"debt": rng.choice(f.debt_ids), "amount": "0.01"})),
+}
+
+
+@dataclass
+class Result:
+    scenario: str
+    timings: list
+    queries: list
+    errors: int
+    wall: float
+
+    def percentile(self, p):
+        ordered = sorted(self.timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0.0
+
+    def summary(self):
+        count = len(self.timings)
+        return {
+            "scenario": self.scenario,
+            "requests": count,
+            "errors": self.errors,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "rps": round(count / self.wall, 1) if self.wall else 0.0,
+            "queries_avg": round(statistics.fmean(self.queries), 1) if self.queries else 0,
+            "queries_max": max(self.queries, default=0),
+        }
+
+
+def run_requests(fixture, scenario, count, seed, worker=False):
+    """Выполняет ``count`` запросов сценария в текущем потоке/процессе.
+
+    ``worker=True`` — воркер пула: в конце закрывает своё соединение с базой.
+    """
+    method, build = SCENARIOS[scenario]
+    rng = random.Random(seed)
+    http = HttpClient(raise_request_exception=False, HTTP_AUTHORIZATION=f"Bearer {fixture.token}")
+    timings, queries, errors = [], [], 0
+    try:
+        for _ in range(count):
+            path, body = build(fixture, rng)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if method == "get":
+                    response = http.get(path)
+                else:
+                    response = http.post(path, body, content_type="application/json")
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            if response.status_code >= 400:
+                errors += 1
+    finally:
+        if worker:
+            connection.close()
+    return timings, queries, errors
+
+
+def run_scenario(fixture, scenario, requests, workers=1, processes=False):
+    """Прогоняет сценарий: ``requests`` запросов на ``workers`` воркеров"""
+    per_worker = [requests // workers + (1 if i < requests % workers else 0) for i in range(workers)]
+    started = time.perf_counter()
+    if workers == 1:
+        parts = [run_requests(fixture, scenario, requests, seed=0)]
+    else:
+        if processes:
+            # Дочерние процессы не должны унаследовать открытые соединения
+            connections.close_all()
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        else:
+            executor = ThreadPoolExecutor(workers)
+        with executor:
+            futures = [
+                executor.submit(run_requests, fixture, scenario, count, seed, worker=True)
+                for seed, count in enumerate(per_worker) if count
+            ]
+            parts = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    return Result(
+        scenario=scenario,
+        timings=[t for part in parts for t in part[0]],
+        queries=[q for part in parts for q in part[1]],
+        errors=sum(part[2] for part in parts),
+        wall=wall,
+    )
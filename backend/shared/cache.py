@@ -0,0 +1,116 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def version_key(company_id):
+    return f"api:version:{company_id}"
+
+
+def company_version(company_id):
+    """Текущая версия данных компании; входит в ключи закэшированных ответов"""
+    cache = get_cache()
+    key = version_key(company_id)
+    version = cache.get(key)
+    if version is None:
+        # Стартуем со времени, а не с 1: если ключ вытеснили,
+        # старые записи с той же версией не оживут
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(company_id):
+    cache = get_cache()
+    try:
+        cache.incr(version_key(company_id))
+    except ValueError:
+        cache.set(version_key(company_id), time.time_ns(), timeout=None)
+
+
+def _after_commit(company_id):
+    if settings.DATABASE_REPLICAS:
+        # Реплика догонит коммит не сразу: без окна чтения с основной базы
+        # следующий GET закэшировал бы отставшие данные под новой версией.
+        # Так прилипают и записи вне API (команды, админка)
+        from core import routers
+        routers.mark_company_write(company_id)
+    _bump(company_id)
+
+
+def bump_company_version(company_id):
+    """Сбрасывает закэшированные списки компании.
+
+    Версия увеличивается сразу и ещё раз после коммита: иначе параллельный
+    запрос мог бы между ними закэшировать данные до коммита под новой версией.
+    """
+    if company_id is None:
+        return
+    _bump(company_id)
+    transaction.on_commit(lambda: _after_commit(company_id))
+
+
+def response_cache_key(view, request, company_id):
+    """Ключ: view, компания, версия компании, URL kwargs и query params"""
+    params = sorted(request.query_params.lists())
+    raw = repr((sorted(view.kwargs.items()), params))
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return f"api:{type(view).__name__}:{company_id}:{company_version(company_id)}:{digest}"
+
+
+def cache_company_response(get):
+    """Read-through кэш GET-обработчика view в разрезе компании.
+
+    Кэшируются только ответы 200 (``response.data`` до рендеринга);
+    ``API_RESPONSE_CACHE_TIMEOUT = 0`` отключает кэш.
+    """
+    @functools.wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        company_id = getattr(request.user, 'company_id', None)
+        timeout = settings.API_RESPONSE_CACHE_TIMEOUT
+        if company_id is None or not timeout:
+            return get(view, request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(view, request, company_id)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = get(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        return response
+
+    return wrapper
+
+
+def cache_company_etag(get_etag):
+    """Кэширует ``get_etag`` view рядом с ответом: пока версия компании не
+    изменилась, ETag и 304 отдаются без запросов к базе."""
+    @functools.wraps(get_etag)
+    def wrapper(view, request):
+        company_id = getattr(request.user, 'company_id', None)
+        timeout = settings.API_RESPONSE_CACHE_TIMEOUT
+        if company_id is None or not timeout:
+            return get_etag(view, request)
+
+        cache = get_cache()
+        key = response_cache_key(view, request, company_id) + ":etag"
+        etag = cache.get(key)
+        if etag is None:
+            etag = get_etag(view, request)
+            if etag is not None:
+                cache.set(key, etag, timeout)
+        return etag
+
+    return wrapper
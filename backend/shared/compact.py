@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.db import models
+from rest_framework.response import Response
+
+
+class CompactRows:
+    """Облегчённое read-only представление модели: словари прямо из ``.values()``.
+
+    Без ModelSerializer и его интроспекции полей. Decimal приводятся к строке
+    с тем же числом знаков, что и у DecimalField сериализатора; остальные
+    значения (UUID, даты, FK как id) кодирует рендерер.
+    """
+
+    def __init__(self, model, fields, **expressions):
+        self.fields = tuple(fields)
+        self.expressions = expressions
+        model_fields = [model._meta.get_field(name) for name in self.fields]
+        # FK в .values('client') приходит как id — так же читаем и из объекта
+        self.attnames = {field.name: field.attname for field in model_fields}
+        self.quantums = {
+            field.name: Decimal(1).scaleb(-field.decimal_places)
+            for field in model_fields
+            if isinstance(field, models.DecimalField)
+        }
+
+    def values(self, queryset, extra=()):
+        fields = self.fields + tuple(name for name in extra if name not in self.fields)
+        return queryset.values(*fields, **self.expressions)
+
+    def row(self, row):
+        for name, quantum in self.quantums.items():
+            value = row[name]
+            if value is not None:
+                row[name] = str(value.quantize(quantum))
+        return row
+
+    def rows(self, rows):
+        return [self.row(row) for row in rows]
+
+    def from_instance(self, obj):
+        return self.row({name: getattr(obj, attname) for name, attname in self.attnames.items()})
+
+
+class CompactListMixin:
+    """``?view=compact`` для generic list views: ``compact_rows`` вместо сериализатора.
+
+    Запись и полное представление по-прежнему идут через ``serializer_class``.
+    """
+    compact_rows = None
+
+    def is_compact(self):
+        return self.request.query_params.get('view') == 'compact'
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_compact():
+            return super().list(request, *args, **kwargs)
+
+        # Курсору нужны поля сортировки у каждой строки
+        extra = ()
+        if self.paginator is not None and self.paginator.get_page_size(request):
+            extra = tuple(field.lstrip('-') for field in self.paginator.ordering)
+
+        queryset = self.compact_rows.values(self.filter_queryset(self.get_queryset()), extra)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.compact_rows.rows(page))
+        return Response(self.compact_rows.rows(queryset))
@@ -0,0 +1,88 @@
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """Слабый ETag из служебных значений (без хэширования тела ответа)"""
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_aggregates(related=()):
+    """max(updated_at) строк и связей ``related`` (их поля тоже попадают в ответ) и число строк"""
+    aggregates = {'last_modified': Max('updated_at'), 'count': Count('pk')}
+    for name in related:
+        aggregates[f'{name}_modified'] = Max(f'{name}__updated_at')
+    return aggregates
+
+
+def queryset_etag(queryset, *parts, related=()):
+    """ETag по max(updated_at) и количеству строк — один агрегирующий запрос"""
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+    stats = queryset.aggregate(**etag_aggregates(related))
+    return make_etag(*stats.values(), *parts)
+
+
+def etag_matches(etag, request):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    # Сравнение слабое: W/"x" и "x" считаются одним тегом
+    return '*' in etags or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+def conditional_get(get):
+    """Conditional GET: ``view.get_etag(request)`` → 304 без сериализации.
+
+    Если ``get_etag`` вернул None (нет компании, объект не найден), запрос
+    обрабатывается как обычно.
+    """
+    @functools.wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        etag = view.get_etag(request)
+        if etag is None:
+            return get(view, request, *args, **kwargs)
+        if etag_matches(etag, request):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = get(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """ETag для generic views по queryset компании.
+
+    Для detail views queryset сужается до объекта из URL, для списков в ключ
+    входят query params (курсор, фильтры). ``etag_related`` — связи, поля
+    которых выводит сериализатор: их изменение тоже меняет ETag.
+    """
+    etag_related = ()
+
+    def get_etag_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_etag(self, request):
+        if getattr(request.user, 'company_id', None) is None:
+            return None
+        return queryset_etag(
+            self.get_etag_queryset(),
+            type(self).__name__,
+            sorted(self.kwargs.items()),
+            sorted(request.query_params.lists()),
+            related=self.etag_related,
+        )
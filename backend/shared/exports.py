@@ -0,0 +1,100 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.views import APIView
+
+from shared.utils import datetime_range, parse_date_param
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (csv_lines, "text/csv; charset=utf-8"),
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+}
+
+
+class ExportView(APIView):
+    """Базовая выгрузка в CSV/NDJSON потоком.
+
+    Строки читаются через ``.iterator(chunk_size=...)`` (server-side cursor
+    на PostgreSQL) и сразу отдаются клиенту, поэтому память воркера не
+    зависит от объёма истории. Параметры: ``output=csv|ndjson``
+    (``format`` занят переопределением рендерера DRF),
+    ``date_from``/``date_to`` (по дате создания) и ``status``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    token_claims_user = True
+    # Модель выгрузки; строки другой компании не попадают (см. get_queryset)
+    model = None
+    # (колонка в файле, поле для values_list)
+    columns = ()
+    filename = "export"
+    date_field = "created_at"
+    # status=<ключ> -> Q-объект; пустой словарь, если фильтр не поддерживается
+    status_filters = {}
+
+    def get_queryset(self, company_id):
+        """Строки компании: по умолчанию ``model`` с фильтром по ``company_id``"""
+        if self.model is None:
+            raise ImproperlyConfigured(f"{type(self).__name__}: задайте model или переопределите get_queryset().")
+        return self.model._default_manager.filter(company_id=company_id)
+
+    def filter_queryset(self, queryset):
+        queryset = queryset.filter(**datetime_range(
+            self.date_field,
+            parse_date_param(self.request, "date_from"),
+            parse_date_param(self.request, "date_to"),
+        ))
+
+        status_name = self.request.query_params.get("status")
+        if status_name:
+            if status_name not in self.status_filters:
+                raise ValidationError({"status": f"Допустимые значения: {', '.join(self.status_filters) or 'нет'}."})
+            queryset = queryset.filter(self.status_filters[status_name]())
+        return queryset
+
+    def get(self, request):
+        company_id = request.user.company_id
+        if company_id is None:
+            raise PermissionDenied("У пользователя нет связанной компании.")
+
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"output": "Допустимые значения: csv, ndjson."})
+        render_lines, content_type = EXPORT_FORMATS[export_format]
+
+        header = [column for column, _ in self.columns]
+        queryset = self.filter_queryset(self.get_queryset(company_id))
+        rows = queryset.order_by("pk").values_list(*[field for _, field in self.columns]).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+
+        response = StreamingHttpResponse(render_lines(header, rows), content_type=content_type)
+        stamp = timezone.now().strftime("%Y%m%d")
+        response["Content-Disposition"] = f'attachment; filename="{self.filename}-{stamp}.{export_format}"'
+        return response
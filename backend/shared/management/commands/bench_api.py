@@ -0,0 +1,102 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from shared.benchmark import SCENARIOS, drop_company, run_scenario, seed_company
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон API по реальным URL: засевает компанию, меряет p50/p95/p99, "
+        "пропускную способность и SQL-запросы по каждому сценарию"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--debts', type=int, default=5000)
+        parser.add_argument('--payments', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=200, help="Запросов на сценарий")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Параллельных воркеров; при >1 сценарий прогоняется ещё и параллельно")
+        parser.add_argument('--processes', action='store_true', help="Воркеры — процессы (fork), а не потоки")
+        parser.add_argument('--scenarios', help=f"Через запятую, из: {', '.join(SCENARIOS)}")
+        parser.add_argument('--no-cache', action='store_true', help="Отключить кэш ответов API")
+        parser.add_argument('--keep', action='store_true', help="Не удалять засеянную компанию")
+        parser.add_argument('--json', dest='json_path', help="Сохранить результаты в JSON")
+        parser.add_argument('--baseline', help="JSON прошлого прогона: сообщить о регрессиях")
+        parser.add_argument('--tolerance', type=float, default=20.0,
+                            help="Допустимый рост p95 в процентах относительно baseline")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',') if options['scenarios'] else list(SCENARIOS)
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+        if options['processes'] and connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("Процессы не видят SQLite в памяти; используйте файл или PostgreSQL.")
+
+        self.stdout.write(
+            f"Засев: {options['clients']} клиентов, {options['debts']} долгов, {options['payments']} платежей "
+            f"({connection.vendor})"
+        )
+        fixture = seed_company(options['clients'], options['debts'], options['payments'])
+
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '')), 'localhost').lstrip('.')
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, host, 'testserver']}
+        if options['no_cache']:
+            overrides['API_RESPONSE_CACHE_TIMEOUT'] = 0
+
+        modes = [1] + ([options['workers']] if options['workers'] > 1 else [])
+        results = []
+        try:
+            with override_settings(**overrides):
+                for workers in modes:
+                    self.stdout.write(f"\nВоркеров: {workers}{' (процессы)' if workers > 1 and options['processes'] else ''}")
+                    self.stdout.write(
+                        f"{'сценарий':<22}{'запросов':>9}{'ошибок':>8}{'p50 мс':>9}{'p95 мс':>9}"
+                        f"{'p99 мс':>9}{'req/s':>9}{'SQL ср':>8}{'SQL max':>8}"
+                    )
+                    for scenario in scenarios:
+                        result = run_scenario(fixture, scenario, options['requests'], workers, options['processes'])
+                        summary = {"workers": workers, **result.summary()}
+                        results.append(summary)
+                        self.stdout.write(
+                            f"{scenario:<22}{summary['requests']:>9}{summary['errors']:>8}{summary['p50_ms']:>9}"
+                            f"{summary['p95_ms']:>9}{summary['p99_ms']:>9}{summary['rps']:>9}"
+                            f"{summary['queries_avg']:>8}{summary['queries_max']:>8}"
+                        )
+        finally:
+            if not options['keep']:
+                drop_company(fixture.company_id)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump({"vendor": connection.vendor, "options": {
+                    key: options[key] for key in ('clients', 'debts', 'payments', 'requests', 'workers', 'processes')
+                }, "results": results}, file, ensure_ascii=False, indent=2)
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def compare(self, results, path, tolerance):
+        with open(path, encoding='utf-8') as file:
+            baseline = {(row['workers'], row['scenario']): row for row in json.load(file)['results']}
+
+        regressions = []
+        for row in results:
+            before = baseline.get((row['workers'], row['scenario']))
+            if before is None:
+                continue
+            if before['p95_ms'] and row['p95_ms'] > before['p95_ms'] * (1 + tolerance / 100):
+                regressions.append(f"{row['scenario']} x{row['workers']}: p95 {before['p95_ms']} -> {row['p95_ms']} мс")
+            if row['queries_max'] > before['queries_max']:
+                regressions.append(
+                    f"{row['scenario']} x{row['workers']}: SQL {before['queries_max']} -> {row['queries_max']}"
+                )
+
+        if regressions:
+            raise CommandError("Регрессии относительно baseline:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Регрессий относительно baseline нет"))
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shared.benchmark import drop_company, seed_company
+
+# Профиль -> (аргументы gunicorn, путь эндпоинта)
+PROFILES = {
+    "wsgi": (["core.wsgi:application"], "/api/debts/"),
+    "asgi": (["core.asgi:application", "-k", "uvicorn_worker.UvicornWorker"], "/api/debts/async/"),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Сервер завершился с кодом {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Сервер не поднялся на порту {port} за {timeout} с")
+
+
+async def fetch(port, path, token, read_chunk, read_delay):
+    """Один GET по сырому HTTP/1.1; медленный клиент читает ответ кусками с паузами"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+            f"Connection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(read_chunk):
+            if read_delay:
+                await asyncio.sleep(read_delay)
+        return int(status_line.split()[1]) if status_line else 0
+    finally:
+        writer.close()
+
+
+async def load(port, path, token, connections, duration, read_chunk, read_delay):
+    timings, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path, token, read_chunk, read_delay)
+            except OSError:
+                status = 0
+            if status == 200:
+                timings.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return timings, errors, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает gunicorn с sync-воркерами (WSGI, синхронный список долгов) и gunicorn+uvicorn "
+        "(ASGI, async-список) при множестве одновременных, в том числе медленных, соединений"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debts', type=int, default=2000, help="Долгов в списке (размер ответа)")
+        parser.add_argument('--workers', type=int, default=2, help="Воркеров gunicorn в каждом профиле")
+        parser.add_argument('--connections', type=int, default=32, help="Одновременных соединений")
+        parser.add_argument('--duration', type=float, default=10.0, help="Длительность прогона, с")
+        parser.add_argument('--read-kbps', type=float, default=0,
+                            help="Скорость чтения ответа клиентом, КБ/с (0 — без ограничения)")
+        parser.add_argument('--profiles', default="wsgi,asgi")
+
+    def handle(self, *args, debts, workers, connections, duration, read_kbps, profiles, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("Серверы в отдельных процессах не видят SQLite в памяти.")
+        profiles = profiles.split(',')
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Неизвестные профили: {', '.join(sorted(unknown))}")
+
+        read_chunk = 16 * 1024
+        read_delay = read_chunk / (read_kbps * 1024) if read_kbps else 0
+
+        fixture = seed_company(clients=max(debts // 10, 1), debts=debts, payments=0)
+        try:
+            for name in profiles:
+                self.run_profile(name, fixture.token, workers, connections, duration, read_chunk, read_delay)
+        finally:
+            drop_company(fixture.company_id)
+
+    def run_profile(self, name, token, workers, connections, duration, read_chunk, read_delay):
+        app_args, path = PROFILES[name]
+        port = free_port()
+        command = [
+            sys.executable, "-m", "gunicorn", *app_args,
+            "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+        ]
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=os.environ.copy())
+        try:
+            wait_for_port(port, process)
+            timings, errors, elapsed = asyncio.run(
+                load(port, path, token, connections, duration, read_chunk, read_delay)
+            )
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        timings.sort()
+        pick = lambda p: timings[min(len(timings) - 1, int(len(timings) * p / 100))] * 1000 if timings else 0
+        self.stdout.write(
+            f"{name}: {workers} воркеров, {connections} соединений — {len(timings)} ответов, {errors} ошибок, "
+            f"{len(timings) / elapsed:.1f} req/s, p50 {pick(50):.0f} мс, p95 {pick(95):.0f} мс, "
+            f"p99 {pick(99):.0f} мс"
+            + (f", среднее {statistics.fmean(timings) * 1000:.0f} мс" if timings else "")
+        )
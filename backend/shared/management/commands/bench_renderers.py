@@ -0,0 +1,70 @@
+import io
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from clients.models import Client
+from clients.serializers import DebtSerializer
+from debts.models import Debt
+from shared.renderers import ORJSONParser, ORJSONRenderer
+
+
+def build_debts(rows):
+    """Долги с клиентами в памяти, без базы — как после select_related('client')"""
+    now = timezone.now()
+    clients = [
+        Client(id=uuid.uuid4(), name=f"Клиент {i}", phone=f"99890{i:07d}", balanse=Decimal("1500.50"),
+               company_id=uuid.uuid4(), created_at=now, updated_at=now)
+        for i in range(max(rows // 10, 1))
+    ]
+    return [
+        Debt(id=i, client=clients[i % len(clients)], company_id=clients[i % len(clients)].company_id,
+             total_amount=Decimal("1500.50"), remaining_amount=Decimal("750.25"),
+             due_date=date.today() + timedelta(days=i % 60), is_paid=False, created_at=now, updated_at=now)
+        for i in range(rows)
+    ]
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = "Сравнивает JSONRenderer/JSONParser DRF с ORJSONRenderer/ORJSONParser на списке долгов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Сколько долгов в ответе")
+        parser.add_argument('--repeat', type=int, default=5, help="Лучший из N прогонов")
+
+    def handle(self, *args, rows, repeat, **options):
+        debts = build_debts(rows)
+        serialize_time, data = best_of(repeat, lambda: DebtSerializer(debts, many=True).data)
+        self.stdout.write(f"{rows} долгов, сериализация (общая для обоих): {serialize_time * 1000:.0f} мс")
+
+        payloads = {}
+        for name, renderer, parser in (
+            ("DRF JSONRenderer", JSONRenderer(), JSONParser()),
+            ("ORJSONRenderer", ORJSONRenderer(), ORJSONParser()),
+        ):
+            render_time, body = best_of(repeat, lambda: renderer.render(data, 'application/json'))
+            parse_time, parsed = best_of(repeat, lambda: parser.parse(io.BytesIO(body)))
+            payloads[name] = parsed
+            self.stdout.write(
+                f"{name:<17} рендер {render_time * 1000:7.1f} мс, разбор {parse_time * 1000:7.1f} мс, "
+                f"{len(body) / 1024:.0f} КБ"
+            )
+
+        first, second = payloads.values()
+        if first != second:
+            self.stderr.write("Внимание: ответы рендереров различаются")
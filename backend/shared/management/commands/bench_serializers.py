@@ -0,0 +1,62 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clients.models import Client
+from clients.serializers import CLIENT_COMPACT, ClientSerializer, DebtSerializer
+from companies.models import Company
+from debts.models import Debt
+from debts.serializers import DEBT_COMPACT
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Стоимость строки списка: полный ModelSerializer против ?view=compact (данные во временной транзакции)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Сколько долгов создать")
+        parser.add_argument('--repeat', type=int, default=3, help="Лучший из N прогонов")
+
+    def handle(self, *args, rows, repeat, **options):
+        with transaction.atomic():
+            company = Company.objects.create(name="bench-serializers")
+            clients = Client.objects.bulk_create(
+                Client(name=f"Клиент {i}", phone=f"99890{i:07d}", company=company, balanse=Decimal("100.00"))
+                for i in range(max(rows // 10, 1))
+            )
+            Debt.objects.bulk_create(
+                Debt(client=clients[i % len(clients)], company=company,
+                     total_amount=Decimal("100.00"), remaining_amount=Decimal("100.00"))
+                for i in range(rows)
+            )
+
+            # Время включает запрос: так же, как его тратит view
+            client_qs = Client.objects.filter(company=company)
+            debt_qs = Debt.objects.filter(company=company)
+            cases = (
+                ("клиенты", len(clients),
+                 lambda: ClientSerializer(client_qs, many=True).data,
+                 lambda: CLIENT_COMPACT.rows(CLIENT_COMPACT.values(client_qs))),
+                ("долги с клиентом", rows,
+                 lambda: DebtSerializer(debt_qs.select_related('client'), many=True).data,
+                 lambda: DEBT_COMPACT.rows(DEBT_COMPACT.values(debt_qs))),
+            )
+            for name, count, full, compact in cases:
+                full_time = best_of(repeat, full)
+                compact_time = best_of(repeat, compact)
+                self.stdout.write(
+                    f"{name:<17} {count:>6} строк: полный {full_time / count * 1e6:6.1f} мкс/строка, "
+                    f"compact {compact_time / count * 1e6:6.1f} мкс/строка (x{full_time / compact_time:.1f})"
+                )
+
+            transaction.set_rollback(True)
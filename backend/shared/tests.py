@@ -1,3 +1,398 @@
-from django.test import TestCase
+import io
+import json
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clients.models import Client
+from companies.models import Company
+from core import routers
+from core.metrics import registry
+from core.middleware import ReplicaRoutingMiddleware, RequestMetricsMiddleware
+from debts.models import Debt
+from payments.models import Payment
+from shared.benchmark import SCENARIOS, run_scenario, seed_company
+from shared.cache import bump_company_version, get_cache
+from shared.exports import ExportView
+from shared.renderers import ORJSONParser, ORJSONRenderer
+from shared.utils import datetime_range, parse_date_param
+from users.models import User
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """orjson-рендерер кодирует данные так же, как стандартный JSONRenderer"""
+
+    def test_matches_stock_renderer(self):
+        data = {
+            "amount": Decimal("1500.50"),
+            "id": uuid.uuid4(),
+            "due_date": date(2030, 1, 1),
+            "created_at": datetime(2030, 1, 1, 12, 30, tzinfo=timezone.utc),
+            "duration": timedelta(minutes=1),
+            "label": gettext_lazy("Долг"),
+            "items": ({"n": 1}, {"n": 2}),
+            1: "ключ-число",
+        }
+        expected = json.loads(JSONRenderer().render(data))
+        # Decimal — строкой, как DecimalField, а не float
+        expected["amount"] = "1500.50"
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), expected)
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_parser(self):
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('{"name": "Али"}'.encode())), {"name": "Али"})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{"))
+
+
+class BenchmarkScenarioTest(TestCase):
+    """Сценарии bench_api проходят по реальным URL без ошибок"""
+
+    def test_scenarios_in_process(self):
+        fixture = seed_company(clients=5, debts=20, payments=30)
+        for scenario in SCENARIOS:
+            summary = run_scenario(fixture, scenario, requests=3).summary()
+            self.assertEqual(summary["requests"], 3, scenario)
+            self.assertEqual(summary["errors"], 0, scenario)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "пул psycopg 3 есть только для PostgreSQL")
+class ConnectionPoolTest(TestCase):
+    """Пул держит не больше max_size соединений под конкурентной нагрузкой и отдаёт только живые"""
+
+    def setUp(self):
+        # Та же тестовая база через пул на 1–3 соединения
+        self.settings_dict = {
+            **connection.settings_dict,
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {**connection.settings_dict["OPTIONS"], "pool": {"min_size": 1, "max_size": 3, "timeout": 10}},
+        }
+        # Пулы хранятся на классе по alias: прячем пул основного соединения (DB_POOL=true)
+        pools = mock.patch.dict(type(connections["default"])._connection_pools, clear=True)
+        pools.start()
+        self.addCleanup(pools.stop)
+
+    def tearDown(self):
+        self.wrapper().close_pool()
+
+    def wrapper(self):
+        return type(connections["default"])(self.settings_dict)
+
+    def backend_pid(self, delay=0):
+        db = self.wrapper()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute("SELECT pg_backend_pid(), pg_sleep(%s)", [delay])
+                return cursor.fetchone()[0]
+        finally:
+            # Соединение возвращается в пул, а не закрывается
+            db.close()
+
+    def test_bounded_under_concurrency(self):
+        with ThreadPoolExecutor(max_workers=12) as executor:
+            pids = list(executor.map(lambda _: self.backend_pid(0.02), range(60)))
+        self.assertEqual(len(pids), 60)
+        self.assertLessEqual(len(set(pids)), 3)
+
+    def test_dead_connection_is_replaced(self):
+        pid = self.backend_pid()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+        self.assertNotEqual(self.backend_pid(), pid)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_TOKEN="secret", API_RESPONSE_CACHE_TIMEOUT=0)
+class RequestMetricsTest(TestCase):
+    """RequestMetricsMiddleware и /api/metrics/ в формате Prometheus"""
+
+    def setUp(self):
+        registry.reset()
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        Debt.objects.create(client=client, total_amount=Decimal("100.00"))
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def metrics(self, **headers):
+        return APIClient().get(reverse("metrics"), **headers)
+
+    def stats(self, view):
+        return registry._views[(view, "GET")]
+
+    def test_server_timing_and_registry(self):
+        response = self.api.get(reverse("debt-list-create"))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries, \d+ duplicates"$')
+        stats = self.stats("debt-list-create")
+        self.assertEqual(stats.count, 1)
+        self.assertGreater(stats.queries, 0)
+        self.assertEqual(stats.response_bytes, len(response.content))
+
+    def test_streaming_response_is_recorded_when_consumed(self):
+        response = self.api.get(reverse("debt-export"))
+        self.assertNotIn(("debt-export", "GET"), registry._views)
+        body = b"".join(response.streaming_content)
+        stats = self.stats("debt-export")
+        self.assertEqual(stats.count, 1)
+        # Строки читаются уже при отдаче тела
+        self.assertGreater(stats.queries, 0)
+        self.assertEqual(stats.response_bytes, len(body))
+
+    def test_prometheus_output(self):
+        self.api.get(reverse("debt-list-create"))
+        response = self.metrics(HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn("# TYPE http_requests_total counter", text)
+        self.assertIn('http_requests_total{view="debt-list-create",method="GET",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="debt-list-create",method="GET",le="+Inf"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{view="debt-list-create",method="GET"} 1', text)
+        self.assertRegex(text, r'http_request_db_queries_total\{view="debt-list-create",method="GET"\} [1-9]')
+
+    def test_token_required(self):
+        self.assertEqual(self.metrics().status_code, 403)
+        self.assertEqual(self.metrics(HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.metrics(HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+    async def test_async_view_stays_async(self):
+        middleware = RequestMetricsMiddleware(self.async_get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get("/"))
+        self.assertIn("Server-Timing", response)
+        self.assertEqual(registry._views[("unresolved", "GET")].count, 1)
+
+    async def async_get_response(self, request):
+        return HttpResponse(b"ok")
+
+    async def test_async_client(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.get(reverse("debt-list-async"), headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Server-Timing", response)
+        stats = self.stats("debt-list-async")
+        self.assertGreater(stats.queries, 0)
+        self.assertEqual(stats.response_bytes, len(response.content))
+
+    @override_settings(REQUEST_METRICS_TOKEN="")
+    def test_without_token(self):
+        self.assertEqual(self.metrics().status_code, 200)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.metrics().status_code, 404)
+        response = self.api.get(reverse("debt-list-create"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(registry._views, {})
+
+
+class DateParamTest(SimpleTestCase):
+    """Разбор дат из query-параметров и полуоткрытый интервал по DateTimeField"""
+
+    def request(self, **params):
+        return mock.Mock(query_params=params)
+
+    def test_parse_date_param(self):
+        self.assertEqual(parse_date_param(self.request(day="2024-02-29"), "day"), date(2024, 2, 29))
+        self.assertIsNone(parse_date_param(self.request(day=""), "day"))
+        self.assertIsNone(parse_date_param(self.request(), "day"))
+        for value in ("29.02.2024", "2024-02-30", "завтра"):
+            with self.assertRaises(ValidationError, msg=value):
+                parse_date_param(self.request(day=value), "day")
+
+    def test_datetime_range(self):
+        lookups = datetime_range("created_at", date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(set(lookups), {"created_at__gte", "created_at__lt"})
+        self.assertEqual(lookups["created_at__lt"] - lookups["created_at__gte"], timedelta(days=31))
+        self.assertEqual(datetime_range("created_at"), {})
+
+
+class ExportViewTest(TestCase):
+    """Потоковая выгрузка CSV/NDJSON: формат, фильтры и строки только своей компании"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        self.paid = Debt.objects.create(client=client, total_amount=Decimal("100.00"))
+        self.overdue = Debt.objects.create(client=client, total_amount=Decimal("50.00"), due_date=date(2020, 1, 1))
+        Payment.objects.create(debt=self.paid, amount=Decimal("100.00"), user=self.user)
+
+        other = Company.objects.create(name="Чужой")
+        other_client = Client.objects.create(name="Вали", phone="998907778899", company=other)
+        self.foreign = Debt.objects.create(client=other_client, total_amount=Decimal("70.00"))
+
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def export(self, name, **params):
+        response = self.api.get(reverse(name), params)
+        if response.status_code == 200:
+            response.body = b"".join(response.streaming_content).decode()
+        return response
+
+    def test_csv(self):
+        response = self.export("debt-export")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertRegex(response["Content-Disposition"], r'filename="debts-\d{8}\.csv"')
+        lines = response.body.splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "client_id", "client_name"])
+        self.assertEqual([int(line.split(",")[0]) for line in lines[1:]], [self.paid.id, self.overdue.id])
+
+    def test_ndjson(self):
+        response = self.export("payment-export", output="ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in response.body.splitlines()]
+        self.assertEqual([row["debt_id"] for row in rows], [self.paid.id])
+        self.assertEqual(rows[0]["amount"], "100.00")
+
+    def test_company_scoping(self):
+        for name in ("debt-export", "client-export", "payment-export"):
+            response = self.export(name, output="ndjson")
+            self.assertEqual(response.status_code, 200, name)
+            self.assertNotIn("Вали", response.body, name)
+            self.assertNotIn(f'"id": {self.foreign.id},', response.body, name)
+
+    def test_status_filter(self):
+        rows = [json.loads(line) for line in self.export("debt-export", output="ndjson", status="overdue").body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.overdue.id])
+        rows = [json.loads(line) for line in self.export("debt-export", output="ndjson", status="paid").body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.paid.id])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.export("debt-export", output="xml").status_code, 400)
+        self.assertEqual(self.export("debt-export", status="lost").status_code, 400)
+        self.assertEqual(self.export("client-export", status="paid").status_code, 400)
+        self.assertEqual(self.export("debt-export", date_from="01.01.2024").status_code, 400)
+
+    def test_user_without_company(self):
+        self.api.force_authenticate(User.objects.create_user(username="nobody", email="nobody@example.com", password="pass"))
+        self.assertEqual(self.export("debt-export").status_code, 403)
+
+    def test_model_is_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ExportView().get_queryset(self.company.id)
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReplicaRouterTest(SimpleTestCase):
+    """Безопасные чтения — на реплику; запись, окно после неё и запросы вне HTTP — на основную базу"""
+
+    # bump_company_version спрашивает у соединения, есть ли открытая транзакция
+    databases = {"default"}
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.company_id = uuid.uuid4()
+        get_cache().delete(routers.sticky_key(self.company_id))
+
+    def start(self, method="GET"):
+        state = routers.RoutingState(method)
+        self.addCleanup(routers.deactivate, routers.activate(state))
+        routers.bind_company(self.company_id)
+        return state
+
+    def test_safe_read_goes_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Debt), "default")
+        self.start()
+        self.assertEqual(self.router.db_for_read(Debt), "replica_1")
+
+        # Чтение после записи в том же запросе
+        self.assertEqual(self.router.db_for_write(Debt), "default")
+        self.assertEqual(self.router.db_for_read(Debt), "default")
+
+    def test_unsafe_request_reads_primary(self):
+        self.start("POST")
+        self.assertEqual(self.router.db_for_read(Debt), "default")
+
+    def test_sticky_window_after_write(self):
+        routers.mark_company_write(self.company_id)
+        self.start()
+        self.assertEqual(self.router.db_for_read(Debt), "default")
+
+    def test_version_bump_marks_company(self):
+        # Записи вне HTTP-запросов (sweep_overdue, reconcile_balances, админка)
+        bump_company_version(self.company_id)
+        self.start()
+        self.assertEqual(self.router.db_for_read(Debt), "default")
+
+    async def test_async_middleware(self):
+        seen = []
+
+        async def get_response(request):
+            state = routers._request_state.get()
+            state.company_id = self.company_id
+            seen.append(self.router.db_for_write(Debt))
+            return HttpResponse(status=201)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().post("/"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(seen, ["default"])
+        self.assertIsNone(routers._request_state.get())
+        # Запись в запросе: компания прилипла к основной базе
+        self.assertIsNotNone(await sync_to_async(get_cache().get)(routers.sticky_key(self.company_id)))
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICAS, "реплики не настроены (DB_REPLICA_URLS)")
+@override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+class ReplicaRoutingRequestTest(TransactionTestCase):
+    """Через HTTP: списки и экспорт читаются с реплики, после оплаты компания прилипает к основной базе"""
+
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        self.debt = Debt.objects.create(client=client, total_amount=Decimal("100.00"))
+        get_cache().delete(routers.sticky_key(self.company.id))
+        self.api = APIClient()
+        # Токен входа несёт company_id: аутентификация без чтения пользователя
+        response = self.api.post(reverse("user-login"), {"login": "seller", "password": "pass"}, format="json")
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as primary:
+            with CaptureQueriesContext(connections[settings.DATABASE_REPLICAS[0]]) as replica:
+                response = self.api.get(url)
+                if response.streaming:
+                    # Тело экспорта читается уже после middleware
+                    b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    @override_settings(DATABASE_REPLICAS=settings.DATABASE_REPLICAS[:1])
+    def test_reads_follow_writes(self):
+        for url in (reverse("debt-list-create"), reverse("debt-export")):
+            primary, replica = self.get(url)
+            self.assertEqual(primary, 0, url)
+            self.assertGreater(replica, 0, url)
+
+        response = self.api.post(reverse("payment-list"), {"debt": self.debt.id, "amount": "40.00"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        primary, replica = self.get(reverse("debt-list-create"))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
@@ -0,0 +1,34 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def parse_date_param(request, name):
+    """Читает дату ГГГГ-ММ-ДД из query-параметра, None если параметр не передан"""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        # Формат верный, но такой даты нет (2024-02-30)
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Ожидается дата в формате ГГГГ-ММ-ДД."})
+    return parsed
+
+
+def datetime_range(field, date_from=None, date_to=None):
+    """Фильтр по дате для DateTimeField в виде полуоткрытого интервала.
+
+    В отличие от ``field__date`` не оборачивает колонку в функцию,
+    поэтому индекс по ``field`` продолжает работать.
+    """
+    lookups = {}
+    if date_from:
+        lookups[f"{field}__gte"] = timezone.make_aware(datetime.combine(date_from, time.min))
+    if date_to:
+        lookups[f"{field}__lt"] = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return lookups
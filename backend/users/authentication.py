@@ -0,0 +1,106 @@
+import copy
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from core import routers
+from shared.lru import TTLCache
+from users.tokens import is_revoked
+
+# user_id -> User с подгруженной компанией
+user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+
+class TokenClaimsUser(TokenUser):
+    """Пользователь, собранный из claims access-токена без обращения к базе"""
+
+    @cached_property
+    def id(self):
+        return uuid.UUID(str(self.token[api_settings.USER_ID_CLAIM]))
+
+    @cached_property
+    def company_id(self):
+        company_id = self.token.get('company_id')
+        return uuid.UUID(company_id) if company_id else None
+
+    @cached_property
+    def user_roles(self):
+        return self.token.get('user_roles')
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без лишних запросов за пользователем и компанией.
+
+    Для представлений с ``token_claims_user = True`` пользователь строится из
+    claims токена (0 запросов). Остальные получают настоящий ``User`` из
+    LRU-кэша процесса, а при промахе — одним запросом с
+    ``select_related('company')``. Старые токены без ``company_id`` всегда
+    идут по второму пути.
+
+    Claims не перечитываются из базы, поэтому отключение пользователя или
+    перевод в другую компанию отзывают его токены отметкой в кэше
+    (``users.tokens.revoke_access_tokens``); между процессами отметка видна
+    только при общем кэше (CACHE_URL=redis://...).
+    """
+
+    def authenticate(self, request):
+        self.view = getattr(request, 'parser_context', {}).get('view')
+        result = super().authenticate(request)
+        if result is not None:
+            routers.bind_company(result[0].company_id)
+        return result
+
+    async def aauthenticate(self, request, view):
+        """authenticate для async views: по claims без базы, иначе User в потоке"""
+        self.view = view
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if getattr(view, 'token_claims_user', False) and 'company_id' in validated_token:
+            user = self.get_user(validated_token)
+        else:
+            user = await sync_to_async(self.get_user)(validated_token)
+        routers.bind_company(user.company_id)
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise AuthenticationFailed(_("Token is invalid or expired"), code="token_not_valid")
+        if getattr(self.view, 'token_claims_user', False) and 'company_id' in validated_token:
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken(_("Token contained no recognizable user identification"))
+            return TokenClaimsUser(validated_token)
+        return self.get_cached_user(validated_token)
+
+    def get_cached_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('company').get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        # Копия, чтобы изменения в рамках запроса не попадали в общий кэш
+        return copy.copy(user)
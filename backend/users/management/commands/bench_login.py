@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from users.models import User
+from users.views import UserLoginView
+
+PASSWORD = "bench-Password-123"
+
+
+class Command(BaseCommand):
+    help = "Замеряет пропускную способность UserLoginView (данные создаются во временной транзакции)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help="Сколько пользователей создать")
+        parser.add_argument('--iterations', type=int, default=200, help="Сколько входов выполнить")
+
+    def handle(self, *args, users, iterations, **options):
+        factory = APIRequestFactory()
+        view = UserLoginView.as_view(throttle_classes=[])
+
+        with transaction.atomic():
+            template = User(username="bench")
+            template.set_password(PASSWORD)
+            User.objects.bulk_create(
+                User(username=f"bench-user-{i}", email=f"bench-user-{i}@example.com", password=template.password)
+                for i in range(users)
+            )
+
+            timings = []
+            queries = []
+            for i in range(iterations):
+                # Чередуем вход по email и по username в разном регистре
+                login = f"Bench-User-{i % users}@Example.com" if i % 2 else f"BENCH-USER-{i % users}"
+                request = factory.post('/api/users/login/', {"login": login, "password": PASSWORD}, format='json')
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = view(request)
+                    timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    self.stderr.write(f"Вход {login} не удался: {response.status_code} {response.data}")
+                    break
+                queries.append(len(captured))
+
+            transaction.set_rollback(True)
+
+        if not timings:
+            return
+        timings.sort()
+        total = sum(timings)
+        self.stdout.write(f"входов: {len(timings)}, за {total:.2f} с — {len(timings) / total:.1f} входов/с")
+        self.stdout.write(
+            f"p50 {statistics.median(timings) * 1000:.1f} мс, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.1f} мс, "
+            f"SQL-запросов на вход: {max(queries)}"
+        )
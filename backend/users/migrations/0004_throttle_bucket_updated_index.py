@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_throttle_bucket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='throttlebucket',
+            name='updated',
+            field=models.FloatField(db_index=True, help_text='Время последнего пополнения, unix timestamp'),
+        ),
+    ]
@@ -3,11 +3,13 @@ import uuid
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
 from django.db import models
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db.models.functions import Lower
 
 from shared.models import BaseModel
+from users.tokens import CompanyRefreshToken, revoke_access_tokens
 
 # Create your models here.
+
 SELLER, MANAGER, ADMIN = ('seller','manager', 'admin')
 
 class User(AbstractUser, BaseModel):
@@ -27,6 +29,12 @@ class User(AbstractUser, BaseModel):
     phone_number = models.CharField(max_length=13, null=True, blank=True, unique=True)
     photo = models.ImageField(upload_to='user_photos/', null=True, blank=True, validators=[FileExtensionValidator(allowed_extensions = ['jpg', 'jpeg', 'heic', 'heif'])])
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -47,7 +55,7 @@ class User(AbstractUser, BaseModel):
             self.email = normalize_email
 
     def token(self):
-        refresh = RefreshToken.for_user(self)
+        refresh = CompanyRefreshToken.for_user(self)
         return {
             "access": str(refresh.access_token),
             "refresh_token": str(refresh)
@@ -60,5 +68,24 @@ class User(AbstractUser, BaseModel):
 
     def save(self, *args, **kwargs):
         self.clean()
+        old = None
+        if not self._state.adding:
+            old = User.objects.filter(pk=self.pk).values('is_active', 'company_id').first()
         super(User, self).save(*args, **kwargs)
 
+        from users.authentication import user_cache
+        user_cache.pop(str(self.pk))
+        # Отключение или перевод в другую компанию: claims выданных токенов устарели
+        if old and (old['is_active'] != self.is_active or old['company_id'] != self.company_id):
+            revoke_access_tokens(self)
+
+
+class ThrottleBucket(models.Model):
+    """Состояние token bucket для users.throttling.DatabaseBucketStorage"""
+    key = models.CharField(max_length=255, primary_key=True)
+    tokens = models.FloatField()
+    # Индекс — для удаления давно пополненных корзин
+    updated = models.FloatField(db_index=True, help_text="Время последнего пополнения, unix timestamp")
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f}"
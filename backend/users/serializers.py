@@ -1,7 +1,11 @@
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from users.models import User
+from users.tokens import CompanyRefreshToken, set_user_claims
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """ Сериализатор для регистрации пользователя """
@@ -31,11 +35,24 @@ class UserLoginSerializer(serializers.Serializer):
 
     def validate(self, data):
         login = data['login'].lower()  # Приводим email к нижнему регистру
-        user = User.objects.filter(email=login).first()
-        if not user:
-            user = User.objects.filter(username=login).first()
-
-        if not user or not user.check_password(data['password']):
+        # Один запрос по индексам lower(email) и lower(username). Совпадение
+        # по email важнее, затем логин с тем же регистром: username
+        # уникален с учётом регистра, таких строк может быть несколько
+        user = (
+            User.objects.alias(email_lower=Lower('email'), username_lower=Lower('username'))
+            .filter(Q(email_lower=login) | Q(username_lower=login))
+            .order_by(
+                Case(
+                    When(email_lower=login, then=Value(0)),
+                    When(username=data['login'], then=Value(1)),
+                    default=Value(2),
+                ),
+                'pk',
+            )
+            .first()
+        )
+
+        if not user or not user.check_password(data['password']) or not user.is_active:
             raise serializers.ValidationError("Неверные учетные данные")
 
         return user  # ДОЛЖЕН ВОЗВРАЩАТЬ ОБЪЕКТ USER, А НЕ DICT
@@ -48,10 +65,16 @@ class TokenRefreshSerializer(serializers.Serializer):
 
     def validate(self, data):
         try:
-            refresh = RefreshToken(data['refresh'])
-            return {'access': str(refresh.access_token)}
-        except Exception:
+            refresh = CompanyRefreshToken(data['refresh'])
+        except TokenError:
+            raise serializers.ValidationError("Невалидный refresh-токен")
+
+        # Refresh живёт долго: пользователь за это время мог быть отключён
+        # или переведён в другую компанию, поэтому claims берутся из базы
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not user.is_active:
             raise serializers.ValidationError("Невалидный refresh-токен")
+        return {'access': str(set_user_claims(refresh.access_token, user))}
 
 
 
@@ -1,3 +1,212 @@
-from django.test import TestCase
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from clients.models import Client
+from companies.models import Company
+from debts.models import Debt
+from users.authentication import user_cache
+from users.models import ThrottleBucket, User
+from users.serializers import UserLoginSerializer
+from users.throttling import database_storage, local_storage
+
+
+class ClaimsAuthenticationTest(TestCase):
+    """Аутентификация по claims не ходит в базу за пользователем и компанией"""
+
+    def setUp(self):
+        user_cache.clear()
+        self.company = Company.objects.create(name="Магазин")
+        self.user = User.objects.create_user(username="seller", email="seller@example.com", password="pass", company=self.company)
+        client = Client.objects.create(name="Али", phone="998901112233", company=self.company)
+        Debt.objects.create(client=client, total_amount=Decimal("100.00"))
+        self.api = APIClient()
+
+    def login(self):
+        response = self.api.post(reverse("user-login"), {"login": "seller", "password": "pass"}, format="json")
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_claims_view_skips_user_lookup(self):
+        self.login()
+        # Агрегат для ETag и сам список, без запроса пользователя
+        with self.assertNumQueries(2):
+            response = self.api.get(reverse("debt-list-create"))
+        self.assertEqual(len(response.data), 1)
+
+    def test_model_user_is_cached(self):
+        self.login()
+        with self.assertNumQueries(1):
+            self.api.get(reverse("user-profile"))
+        with self.assertNumQueries(0):
+            response = self.api.get(reverse("user-profile"))
+        self.assertEqual(response.data["email"], "seller@example.com")
+
+    def test_token_without_claims_falls_back_to_user(self):
+        access = RefreshToken.for_user(self.user).access_token
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with self.assertNumQueries(3):
+            response = self.api.get(reverse("debt-list-create"))
+        self.assertEqual(len(response.data), 1)
+
+    def test_deactivated_user_is_rejected(self):
+        response = self.api.post(reverse("user-login"), {"login": "seller", "password": "pass"}, format="json")
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.api.get(reverse("debt-list-create")).status_code, 401)
+        self.assertEqual(self.api.get(reverse("debt-list-async")).status_code, 401)
+        refreshed = self.api.post(reverse("token-refresh"), {"refresh": response.data["refresh"]}, format="json")
+        self.assertEqual(refreshed.status_code, 400)
+        self.api.credentials()
+        self.assertEqual(self.api.post(reverse("user-login"), {"login": "seller", "password": "pass"}).status_code, 400)
+
+    def test_refresh_rewrites_claims(self):
+        response = self.api.post(reverse("user-login"), {"login": "seller", "password": "pass"}, format="json")
+        other = Company.objects.create(name="Другой магазин")
+        self.user.company = other
+        self.user.save()
+
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.api.get(reverse("debt-list-create")).status_code, 401)
+        refreshed = self.api.post(reverse("token-refresh"), {"refresh": response.data["refresh"]}, format="json")
+        self.assertEqual(AccessToken(refreshed.data["access"])["company_id"], str(other.pk))
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {refreshed.data['access']}")
+        self.assertEqual(self.api.get(reverse("debt-list-create")).status_code, 200)
+
+
+@override_settings(TOKEN_BUCKET_DATABASE=False)
+class LoginQueryTest(TestCase):
+    """Вход по email или username — один запрос без учёта регистра"""
+
+    def setUp(self):
+        local_storage.clear()
+        User.objects.create_user(username="seller", email="seller@example.com", password="pass")
+        self.api = APIClient()
+
+    def test_login_by_email_or_username(self):
+        for login in ("Seller@Example.com", "SELLER"):
+            with self.assertNumQueries(1):
+                response = self.api.post(reverse("user-login"), {"login": login, "password": "pass"}, format="json")
+            self.assertEqual(response.status_code, 200)
+
+    def test_wrong_password(self):
+        response = self.api.post(reverse("user-login"), {"login": "seller", "password": "wrong"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def login(self, login, password):
+        return self.api.post(reverse("user-login"), {"login": login, "password": password}, format="json")
+
+    def test_email_match_wins_over_case_variant_usernames(self):
+        User.objects.create_user(username="Ali@example.com", email="a1@example.com", password="first")
+        User.objects.create_user(username="ali@example.com", email="a2@example.com", password="second")
+        owner = User.objects.create_user(username="ali", email="ali@example.com", password="owner")
+        response = self.login("ALI@example.com", "owner")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["id"], str(owner.id))
+
+    def test_exact_username_case_wins(self):
+        User.objects.create_user(username="bob", email="bob1@example.com", password="lower")
+        upper = User.objects.create_user(username="Bob", email="bob2@example.com", password="upper")
+        response = self.login("Bob", "upper")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["id"], str(upper.id))
+
+
+@override_settings(TOKEN_BUCKET_RATES={'login': (3, 1), 'register': (2, 1)})
+class LoginThrottleTest(TestCase):
+    """Token bucket отклоняет попытки входа до проверки пароля"""
+
+    def setUp(self):
+        local_storage.clear()
+        User.objects.create_user(username="seller", email="seller@example.com", password="pass")
+        self.api = APIClient()
+
+    def login(self, login, password="wrong"):
+        return self.api.post(reverse("user-login"), {"login": login, "password": password}, format="json")
+
+    def test_burst_is_rejected_without_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login("seller").status_code, 400)
+
+        # Корзина процесса отказывает сразу: ни базы, ни хэширования
+        with self.assertNumQueries(0):
+            response = self.login("seller", password="pass")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_database_bucket_is_shared_between_workers(self):
+        for _ in range(3):
+            self.login("seller")
+        self.assertEqual(ThrottleBucket.objects.filter(key__startswith="login:").count(), 2)
+
+        # Новый воркер начинает с пустыми корзинами в памяти
+        local_storage.clear()
+        self.assertEqual(self.login("seller").status_code, 429)
+
+    @override_settings(TOKEN_BUCKET_DATABASE=False)
+    def test_account_bucket(self):
+        for _ in range(3):
+            self.login("seller")
+        self.api.defaults["REMOTE_ADDR"] = "10.0.0.2"
+        self.assertEqual(self.login("SELLER").status_code, 429)
+        self.assertEqual(self.login("other").status_code, 400)
+
+    def test_successful_logins_are_refunded(self):
+        for _ in range(5):
+            self.assertEqual(self.login("seller", password="pass").status_code, 200)
+        self.assertEqual(list(ThrottleBucket.objects.values_list("tokens", flat=True)), [3, 3])
+        self.assertEqual(self.login("seller").status_code, 400)
+
+    def test_token_is_taken_before_password_check(self):
+        tokens = []
+        validate = UserLoginSerializer.validate
+
+        def check_bucket(serializer, data):
+            # Параллельная попытка увидит уже уменьшенную корзину
+            tokens.append(ThrottleBucket.objects.get(key="login:account:seller").tokens)
+            return validate(serializer, data)
+
+        with mock.patch.object(UserLoginSerializer, "validate", autospec=True, side_effect=check_bucket):
+            self.login("seller")
+        self.assertEqual(tokens, [2])
+
+    def test_forwarded_for_is_not_trusted_by_default(self):
+        for index in range(3):
+            self.api.post(reverse("user-login"), {"login": f"user{index}", "password": "x"}, format="json",
+                          HTTP_X_FORWARDED_FOR=f"203.0.113.{index}")
+        response = self.api.post(reverse("user-login"), {"login": "user9", "password": "x"}, format="json",
+                                 HTTP_X_FORWARDED_FOR="203.0.113.9")
+        self.assertEqual(response.status_code, 429)
+
+    def test_forwarded_for_behind_proxy(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            # nginx дописывает адрес клиента в конец; подставленное клиентом начало не считается
+            for index in range(3):
+                self.api.post(reverse("user-login"), {"login": f"user{index}", "password": "x"}, format="json",
+                              HTTP_X_FORWARDED_FOR=f"203.0.113.{index}, 198.51.100.7")
+            response = self.api.post(reverse("user-login"), {"login": "user9", "password": "x"}, format="json",
+                                     HTTP_X_FORWARDED_FOR="203.0.113.9, 198.51.100.7")
+            self.assertEqual(response.status_code, 429)
+            response = self.api.post(reverse("user-login"), {"login": "user9", "password": "x"}, format="json",
+                                     HTTP_X_FORWARDED_FOR="198.51.100.8")
+            self.assertEqual(response.status_code, 400)
+
+    @override_settings(TOKEN_BUCKET_DATABASE=False, TOKEN_BUCKET_LOCAL_MAX_KEYS=5)
+    def test_local_buckets_are_bounded(self):
+        for index in range(20):
+            self.login(f"user{index}")
+        self.assertLessEqual(len(local_storage), 5)
+
+    def test_idle_database_buckets_are_pruned(self):
+        self.login("someone")
+        # Полное пополнение: 3 токена по 1 в минуту
+        ThrottleBucket.objects.update(updated=time.time() - 181)
+        self.assertEqual(database_storage.prune(time.time(), force=True), 2)
+        self.assertFalse(ThrottleBucket.objects.exists())
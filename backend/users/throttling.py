@@ -0,0 +1,166 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework.throttling import BaseThrottle
+
+from users.models import ThrottleBucket
+
+
+def refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class LocalBucketStorage:
+    """Корзины в памяти процесса: отсекают поток попыток без обращения к базе.
+
+    Ключей не больше ``TOKEN_BUCKET_LOCAL_MAX_KEYS``: при переполнении
+    вытесняются давно не менявшиеся корзины — они почти или полностью
+    пополнены, общий лимит держит корзина в базе.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def refund(self, key):
+        """Возвращает списанный токен (refill не даст превысить ёмкость)"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (tokens + 1, updated)
+
+    def consume(self, key, capacity, rate, now):
+        """Забирает один токен; возвращает 0 или сколько секунд ждать"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = refill(tokens, updated, capacity, rate, now)
+            # Порядок вставки = порядок последнего изменения
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            while len(self._buckets) > settings.TOKEN_BUCKET_LOCAL_MAX_KEYS:
+                del self._buckets[next(iter(self._buckets))]
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class DatabaseBucketStorage:
+    """Корзины в таблице ThrottleBucket, общие для всех воркеров.
+
+    Раз в ``TOKEN_BUCKET_PRUNE_SECONDS`` процесс удаляет корзины, которые
+    не менялись дольше полного пополнения: они ничем не отличаются от
+    отсутствующих, а ключи (логины) выбирает клиент.
+    """
+
+    def __init__(self):
+        self._next_prune = 0
+
+    def refund(self, key):
+        ThrottleBucket.objects.filter(key=key).update(tokens=F('tokens') + 1)
+
+    def consume(self, key, capacity, rate, now):
+        self.prune(now)
+        with transaction.atomic():
+            bucket = ThrottleBucket.objects.select_for_update().filter(key=key).first()
+            if bucket is None:
+                try:
+                    with transaction.atomic():
+                        ThrottleBucket.objects.create(key=key, tokens=capacity - 1, updated=now)
+                    return 0
+                except IntegrityError:
+                    bucket = ThrottleBucket.objects.select_for_update().get(key=key)
+
+            tokens = refill(bucket.tokens, bucket.updated, capacity, rate, now)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            bucket.tokens = tokens - 1 if tokens >= 1 else tokens
+            bucket.updated = now
+            bucket.save(update_fields=['tokens', 'updated'])
+            return wait
+
+    def prune(self, now, force=False):
+        """Удаляет полностью пополненные корзины (по индексу на ``updated``)"""
+        if not force and now < self._next_prune:
+            return 0
+        self._next_prune = now + settings.TOKEN_BUCKET_PRUNE_SECONDS
+        idle = max(capacity / (per_minute / 60) for capacity, per_minute in settings.TOKEN_BUCKET_RATES.values())
+        deleted, _ = ThrottleBucket.objects.filter(updated__lt=now - idle).delete()
+        return deleted
+
+
+local_storage = LocalBucketStorage()
+database_storage = DatabaseBucketStorage()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket по IP (и другим ключам) для эндпоинтов входа.
+
+    Сначала проверяется корзина процесса, затем — при
+    ``TOKEN_BUCKET_DATABASE`` — общая корзина в базе. Троттлинг выполняется
+    в ``APIView.initial``, то есть до проверки пароля.
+    """
+    scope = None
+
+    def get_keys(self, request, view):
+        return [self.get_ident(request)]
+
+    def get_storages(self):
+        if settings.TOKEN_BUCKET_DATABASE:
+            return [local_storage, database_storage]
+        return [local_storage]
+
+    def allow_request(self, request, view):
+        capacity, per_minute = settings.TOKEN_BUCKET_RATES[self.scope]
+        rate = per_minute / 60
+        now = time.time()
+        keys = [f"{self.scope}:{key}" for key in self.get_keys(request, view)]
+
+        self.wait_seconds = 0
+        for storage in self.get_storages():
+            for key in keys:
+                self.wait_seconds = max(self.wait_seconds, storage.consume(key, capacity, rate, now))
+            if self.wait_seconds:
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Ограничивает неудачные попытки входа с одного IP и на один логин.
+
+    Токен списывается атомарно ещё до проверки пароля, так что
+    параллельная пачка попыток не проходит мимо лимита, а после успешного
+    входа возвращается (``refund``): успешные входы продавцов за общим IP
+    магазина лимит не расходуют.
+    """
+    scope = 'login'
+
+    def get_keys(self, request, view):
+        keys = super().get_keys(request, view)
+        login = request.data.get('login') if hasattr(request.data, 'get') else None
+        if isinstance(login, str) and login:
+            keys.append(f"account:{login.lower()[:150]}")
+        return keys
+
+    def refund(self, request, view):
+        """Возвращает токены, списанные при проверке этого запроса"""
+        for storage in self.get_storages():
+            for key in self.get_keys(request, view):
+                storage.refund(f"{self.scope}:{key}")
+
+
+class RegistrationThrottle(TokenBucketThrottle):
+    scope = 'register'
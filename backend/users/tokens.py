@@ -0,0 +1,53 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shared.cache import get_cache
+
+
+def set_user_claims(token, user):
+    """Записывает в токен компанию и роль пользователя"""
+    token['company_id'] = str(user.company_id) if user.company_id else None
+    token['user_roles'] = user.user_roles
+    return token
+
+
+class CompanyRefreshToken(RefreshToken):
+    """Refresh-токен с company_id и user_roles в claims.
+
+    Access-токен наследует эти claims, поэтому эндпоинты с
+    ``token_claims_user = True`` обходятся без загрузки пользователя.
+    При обновлении (``TokenRefreshSerializer``) claims пишутся заново
+    по пользователю из базы.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        return set_user_claims(super().for_user(user), user)
+
+
+def revoked_key(user_id):
+    return f'auth:revoked:{user_id}'
+
+
+def revoke_access_tokens(user):
+    """Выданные access-токены с устаревшими claims больше не принимаются.
+
+    Вызывается при отключении пользователя, переводе в другую компанию и
+    обратно. Запоминается текущее состояние: токены отключённого
+    пользователя и токены с чужим ``company_id`` отклоняются. Отметка живёт
+    ACCESS_TOKEN_LIFETIME — дольше старые токены и так не действуют, а новые
+    (вход и refresh) выдаются уже по пользователю из базы.
+    """
+    get_cache().set(
+        revoked_key(user.pk),
+        (user.is_active, str(user.company_id) if user.company_id else None),
+        int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+    )
+
+
+def is_revoked(token):
+    state = get_cache().get(revoked_key(token.get(api_settings.USER_ID_CLAIM)))
+    if state is None:
+        return False
+    is_active, company_id = state
+    return not is_active or ('company_id' in token and token['company_id'] != company_id)
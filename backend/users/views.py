@@ -1,15 +1,19 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from users.models import User
 from users.serializers import UserRegistrationSerializer, UserLoginSerializer, TokenRefreshSerializer, UserSerializer
+from users.throttling import LoginThrottle, RegistrationThrottle
+from users.tokens import CompanyRefreshToken
 
 
 class UserRegistrationView(APIView):
     """ Регистрация нового пользователя """
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [RegistrationThrottle]
+
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
 
@@ -27,13 +31,18 @@ class UserRegistrationView(APIView):
 class UserLoginView(APIView):
     """ Вход в систему и выдача токенов """
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [LoginThrottle]
+
     def post(self, request):
         serializer = UserLoginSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # В корзинах LoginThrottle остаются только неудачные попытки
+        LoginThrottle().refund(request, self)
 
         user = serializer.validated_data  # Теперь это объект User
-        refresh = RefreshToken.for_user(user)
+        refresh = CompanyRefreshToken.for_user(user)
 
         return Response({
             "user": UserSerializer(user).data,  # Если нужно вернуть информацию о пользователе
@@ -43,6 +52,9 @@ class UserLoginView(APIView):
 
 class TokenRefreshView(APIView):
     """ Обновление JWT-токена """
+    # Access-токен к этому моменту обычно уже истёк, проверяется только refresh
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
     def post(self, request):
         serializer = TokenRefreshSerializer(data=request.data)
         if serializer.is_valid():